@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import apply_sqlite_pragmas, install_query_metrics
+        connection_created.connect(apply_sqlite_pragmas,
+                                   dispatch_uid='core_sqlite_pragmas')
+        connection_created.connect(install_query_metrics,
+                                   dispatch_uid='core_query_metrics')
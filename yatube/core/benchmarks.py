@@ -0,0 +1,32 @@
+import math
+import os
+
+from django.conf import settings
+
+
+def percentile(values, pct):
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds):
+    """p50/p95/p99/max в миллисекундах для списка длительностей."""
+    return {f'p{pct}': round(percentile(seconds, pct) * 1000, 3)
+            for pct in (50, 95, 99, 100)}
+
+
+def isolated_caches(directory):
+    """CACHES прогона, чтобы cache.clear() не стер кэш работающего сайта.
+
+    Общий кэш подменяется файлом SQLite в каталоге directory; кэш
+    в памяти процесса (locmem) и так свой у каждого процесса.
+    """
+    if 'shared' not in settings.CACHES:
+        return settings.CACHES
+    return {**settings.CACHES, 'shared': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(directory, 'cache.sqlite3')}}
@@ -0,0 +1,266 @@
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.functional import cached_property
+
+SQLITE_BATCH = 500
+MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в отдельном файле SQLite, общий для всех процессов хоста.
+
+    Не требует внешних сервисов: каждый поток держит свое соединение,
+    журнал WAL позволяет читать во время записи.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # После fork соединение родителя использовать нельзя.
+        pid, connection = getattr(self._local, 'db', (None, None))
+        if pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, '
+                'value BLOB NOT NULL, expires REAL) WITHOUT ROWID')
+            self._local.db = os.getpid(), connection
+        return connection
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _row(self, key, value, timeout):
+        return (key, pickle.dumps(value, self.pickle_protocol),
+                self.get_backend_timeout(timeout))
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = {}
+        names = list(keys)
+        for start in range(0, len(names), SQLITE_BATCH):
+            batch = names[start:start + SQLITE_BATCH]
+            rows = self._db.execute(
+                f'SELECT key, value FROM cache WHERE key IN '
+                f'({", ".join("?" * len(batch))}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                [*batch, time.time()])
+            for name, value in rows:
+                found[keys[name]] = pickle.loads(value)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [self._row(self._key(key, version), value, timeout)
+                for key, value in data.items()]
+        with self._db as db:
+            db.execute('BEGIN')
+            db.executemany('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)',
+                           rows)
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        """Записывает значение, только если ключа нет или он истек."""
+        cursor = self._db.execute(
+            'INSERT INTO cache VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE '
+            'SET value = excluded.value, expires = excluded.expires '
+            'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+            [*self._row(self._key(key, version), value, timeout),
+             time.time()])
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись под BEGIN IMMEDIATE."""
+        name = self._key(key, version)
+        with self._db as db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                [name, time.time()]).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute('UPDATE cache SET value = ? WHERE key = ?',
+                       [pickle.dumps(value, self.pickle_protocol), name])
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ? WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()])
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def delete(self, key, version=None):
+        self._db.execute('DELETE FROM cache WHERE key = ?',
+                         [self._key(key, version)])
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _maybe_cull(self):
+        """Изредка чистит истекшие записи и лишнее сверх MAX_ENTRIES."""
+        if random.randrange(self._cull_frequency * 10):
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', [time.time()])
+        count, = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache '
+                'ORDER BY expires IS NULL, expires LIMIT ?)',
+                [count // self._cull_frequency])
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = MISSING
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """Локальный кэш процесса перед общим кэшем из LOCATION.
+
+    Попадания в общий кэш копируются в память процесса на LOCAL_TIMEOUT
+    секунд; запись идет в оба уровня. Удаление в другом процессе станет
+    видно здесь не позже LOCAL_TIMEOUT, поэтому ключи с префиксами из
+    LOCAL_EXCLUDE, например версии страниц, всегда читаются из общего
+    кэша. С COALESCE одновременные промахи процесса по одному ключу
+    ждут единственного чтения из общего кэша.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.local_exclude = tuple(options.get('LOCAL_EXCLUDE', ()))
+        self.coalesce = options.get('COALESCE', False)
+        self.local = LocMemCache(f'tiered:{location}', {
+            'TIMEOUT': self.local_timeout,
+            'OPTIONS': {'MAX_ENTRIES': options.get('LOCAL_MAX_ENTRIES',
+                                                   1000)}})
+
+    @cached_property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local(self, key):
+        return self.local_timeout > 0 and not key.startswith(
+            self.local_exclude)
+
+    def _local_timeout(self, timeout):
+        if timeout == DEFAULT_TIMEOUT or timeout is None:
+            return self.local_timeout
+        return min(timeout, self.local_timeout)
+
+    def _shared_get(self, key, version):
+        if not self.coalesce:
+            return self.shared.get(key, MISSING, version)
+        ident = (self.shared_alias, key, version)
+        with _flights_lock:
+            flight = _flights.get(ident)
+            leader = flight is None
+            if leader:
+                flight = _flights[ident] = Flight()
+        if not leader:
+            flight.done.wait()
+            return flight.value
+        try:
+            flight.value = self.shared.get(key, MISSING, version)
+            return flight.value
+        finally:
+            with _flights_lock:
+                del _flights[ident]
+            flight.done.set()
+
+    def get(self, key, default=None, version=None):
+        if not self._local(key):
+            return self.shared.get(key, default, version)
+        value = self.local.get(key, MISSING, version)
+        if value is MISSING:
+            value = self._shared_get(key, version)
+            if value is MISSING:
+                return default
+            self.local.set(key, value, self.local_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        local_keys = [key for key in keys if self._local(key)]
+        found = self.local.get_many(local_keys, version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            self.local.set_many({key: value for key, value in shared.items()
+                                 if self._local(key)},
+                                self.local_timeout, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        if self._local(key):
+            self.local.set(key, value, self._local_timeout(timeout), version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        self.local.set_many({key: value for key, value in data.items()
+                             if self._local(key) and key not in failed},
+                            self._local_timeout(timeout), version)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added and self._local(key):
+            self.local.set(key, value, self._local_timeout(timeout), version)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version)
+        return self.shared.incr(key, delta, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, MISSING, version) is not MISSING
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version)
+        self.shared.delete(key, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
@@ -0,0 +1,22 @@
+from django.conf import settings
+
+from .metrics import record_query
+
+
+def sqlite_pragmas_sql(pragmas):
+    return [f'PRAGMA {name} = {value}' for name, value in pragmas.items()]
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение SQLite по профилю из settings."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in sqlite_pragmas_sql(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
+
+
+def install_query_metrics(sender, connection, **kwargs):
+    """Подключает учет запросов к соединению один раз за его жизнь."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
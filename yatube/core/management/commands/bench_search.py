@@ -0,0 +1,67 @@
+import random
+import re
+import time
+
+from core.benchmarks import latency_summary
+from django.core.management.base import BaseCommand, CommandError
+from posts.models import Post
+from posts.search import full_text_available, search_posts
+from posts.utils import POSTS_ORDERING
+
+PAGE_SIZE = 10
+SAMPLE_POSTS = 200
+
+
+def like_search(query):
+    return list(Post.objects.filter(text__icontains=query)
+                .order_by(*POSTS_ORDERING)[:PAGE_SIZE])
+
+
+def full_text_search(query):
+    posts, ordering = search_posts(Post.objects.all(), query)
+    return list(posts.order_by(*ordering)[:PAGE_SIZE])
+
+
+def sample_words(count):
+    """Слова из случайных постов базы, чтобы запросы что-то находили."""
+    texts = (Post.objects.order_by('?')
+             .values_list('text', flat=True)[:SAMPLE_POSTS])
+    words = sorted({word for text in texts
+                    for word in re.findall(r'\w{4,}', text.lower())})
+    return random.sample(words, min(count, len(words)))
+
+
+def measure(search, queries, repeat):
+    latencies = []
+    for _ in range(repeat):
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            latencies.append(time.perf_counter() - started)
+    return latency_summary(latencies)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск по постам: LIKE из админки против индекса '
+            'FTS5 на текущей базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*',
+                            help='запросы; по умолчанию слова из постов')
+        parser.add_argument('--words', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if not full_text_available():
+            raise CommandError('Полнотекстовый индекс есть только у SQLite')
+        queries = options['queries'] or sample_words(options['words'])
+        if not queries:
+            raise CommandError('В базе нет постов для поиска')
+        self.stdout.write(f'Постов: {Post.objects.count()}, '
+                          f'запросов: {len(queries)}')
+        for name, search in (('LIKE', like_search),
+                             ('FTS5', full_text_search)):
+            result = measure(search, queries, options['repeat'])
+            self.stdout.write(
+                f"{name:>4}: p50={result['p50']}ms p95={result['p95']}ms "
+                f"p99={result['p99']}ms max={result['p100']}ms")
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from core.benchmarks import latency_summary
+from core.db import sqlite_pragmas_sql
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+ROLLBACK_JOURNAL = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+SEED_ROWS = 10000
+WRITE_BATCH = 200
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path, timeout=5, isolation_level=None,
+                                 check_same_thread=False)
+    for statement in sqlite_pragmas_sql(pragmas):
+        connection.execute(statement)
+    return connection
+
+
+def prepare(path):
+    connection = connect(path, {})
+    connection.executescript(
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, pub_date REAL, '
+        'text TEXT);'
+        'CREATE INDEX post_pub_date ON post (pub_date);')
+    connection.executemany(
+        'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+        ((number, 'x' * 200) for number in range(SEED_ROWS)))
+    connection.close()
+
+
+def run(pragmas, duration, readers):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        prepare(path)
+        stop = threading.Event()
+        latencies = []
+        stats = {'writes': 0, 'errors': 0}
+
+        def write():
+            connection = connect(path, pragmas)
+            while not stop.is_set():
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(
+                    'INSERT INTO post (pub_date, text) VALUES (?, ?)',
+                    ((time.time(), 'y' * 200) for _ in range(WRITE_BATCH)))
+                connection.execute('COMMIT')
+                stats['writes'] += 1
+            connection.close()
+
+        def read():
+            connection = connect(path, pragmas)
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute(
+                        'SELECT * FROM post ORDER BY pub_date DESC '
+                        'LIMIT 10').fetchall()
+                except sqlite3.OperationalError:
+                    stats['errors'] += 1
+                latencies.append(time.perf_counter() - started)
+            connection.close()
+
+        threads = [threading.Thread(target=write)]
+        threads += [threading.Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return {'reads': len(latencies), **stats, **latency_summary(latencies)}
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку чтения во время записи: стандартный '
+            'rollback journal против профиля SQLITE_PRAGMAS')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=3.0)
+        parser.add_argument('--readers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        profiles = (('rollback journal', ROLLBACK_JOURNAL),
+                    ('settings profile', settings.SQLITE_PRAGMAS))
+        for name, pragmas in profiles:
+            result = run(pragmas, options['duration'], options['readers'])
+            self.stdout.write(
+                f"{name:>17}: reads={result['reads']} "
+                f"writes={result['writes']} errors={result['errors']} "
+                f"p50={result['p50']}ms p99={result['p99']}ms "
+                f"max={result['p100']}ms")
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+import time
+
+from core.benchmarks import isolated_caches, percentile
+from core.template_backends import reset_templates, warm_templates
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.datagen import DataGenerator
+from posts.models import Follow, Group, Post, User
+
+from .bench_views import WSGIClient, git_commit, positive
+
+
+def pages():
+    """Страницы прогона: у каждой свой набор шаблонов."""
+    post = Post.objects.order_by('pk').first()
+    return {
+        'index': reverse('posts:index'),
+        'discussed': reverse('posts:discussed'),
+        'group_posts': reverse('posts:group_list', args=[
+            Group.objects.order_by('pk').values_list('slug',
+                                                     flat=True).first()]),
+        'profile': reverse('posts:profile', args=[post.author.username]),
+        'post_detail': reverse('posts:post_detail', args=[post.pk]),
+        'follow_index': reverse('posts:follow_index'),
+        'post_create': reverse('posts:post_create'),
+        'search': reverse('posts:search'),
+        'about': reverse('about:author'),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Первый запрос к каждой странице: шаблоны без компиляции '
+            'при старте и после warm_templates')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--rounds', type=positive, default=20,
+                            help='первых запросов на страницу в каждом режиме')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--json', metavar='PATH',
+                            help='записать результаты в JSON ("-" - stdout)')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            connection.settings_dict['TEST'] = {
+                **connection.settings_dict.get('TEST', {}),
+                'NAME': os.path.join(directory, 'bench.sqlite3')}
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(CACHES=isolated_caches(directory)):
+                    report = self.bench(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        if options['json'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def bench(self, options):
+        rows = DataGenerator(options['seed']).generate(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'])
+        client = WSGIClient(get_wsgi_application())
+        reader = (Follow.objects.order_by('user')
+                  .values_list('user', flat=True).first())
+        client.login(User.objects.filter(pk=reader).first()
+                     or User.objects.order_by('pk').first())
+        started = time.perf_counter()
+        compiled = warm_templates()
+        warmup = time.perf_counter() - started
+        self.stderr.write(f'Прогрев: {compiled} шаблонов '
+                          f'за {warmup * 1000:.1f} мс')
+        results = {}
+        for name, path in pages().items():
+            cold = self.run(client, path, options['rounds'], reset_templates)
+            warm = self.run(client, path, options['rounds'], warm_templates)
+            results[name] = {'cold_p50': cold, 'warm_p50': warm,
+                             'saved': round(cold - warm, 3)}
+            self.stderr.write(f'{name:>12}: cold={cold}ms warm={warm}ms '
+                              f'saved={results[name]["saved"]}ms')
+        return {'commit': git_commit(),
+                'created': timezone.now().isoformat(),
+                'options': {key: options[key] for key in (
+                    'users', 'groups', 'posts', 'comments', 'follows',
+                    'rounds', 'seed')},
+                'rows': rows,
+                'warmup': {'templates': compiled,
+                           'ms': round(warmup * 1000, 3)},
+                'results': results}
+
+    def run(self, client, path, rounds, prepare):
+        """p50 первого запроса к странице в мс после prepare().
+
+        Кэш страниц очищается, чтобы страница каждый раз рендерилась.
+        """
+        latencies = []
+        for _ in range(rounds):
+            prepare()
+            cache.clear()
+            request_started = time.perf_counter()
+            client.request('GET', path)
+            latencies.append(time.perf_counter() - request_started)
+        return round(percentile(latencies, 50) * 1000, 3)
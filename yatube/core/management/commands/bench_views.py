@@ -0,0 +1,224 @@
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+from argparse import ArgumentTypeError
+from http.cookies import SimpleCookie
+from io import BytesIO
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from core.benchmarks import isolated_caches, latency_summary
+from django.conf import settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from posts.datagen import DataGenerator
+from posts.models import Follow, Group, Post, User
+
+SCENARIOS = ('index', 'group_posts', 'profile', 'post_detail',
+             'follow_index', 'post_create', 'add_comment')
+WARMUP = 5
+
+
+class WSGIClient:
+    """Запросы к WSGI-приложению в том же процессе, без сети."""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookies = SimpleCookie()
+
+    def request(self, method, path, data=None):
+        body = urlencode(data or {}).encode()
+        environ = {}
+        setup_testing_defaults(environ)
+        environ.update({
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': '',
+            'HTTP_HOST': 'localhost',
+            'REMOTE_ADDR': '198.51.100.1',
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body),
+            'HTTP_COOKIE': '; '.join(f'{name}={morsel.value}' for name, morsel
+                                     in self.cookies.items()),
+        })
+        if 'csrftoken' in self.cookies:
+            environ['HTTP_X_CSRFTOKEN'] = self.cookies['csrftoken'].value
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split()[0])
+            for name, value in headers:
+                if name.lower() == 'set-cookie':
+                    self.cookies.load(value)
+
+        result = self.app(environ, start_response)
+        try:
+            b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status']
+
+    def login(self, user):
+        """Сессия, как у вошедшего пользователя, без формы входа."""
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        self.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+
+def positive(value):
+    value = int(value)
+    if value < 1:
+        raise ArgumentTypeError('нужно число больше нуля')
+    return value
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный прогон страниц yatube через WSGI в процессе '
+            'на сгенерированных данных во временной базе')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--follows', type=int, default=2000)
+        parser.add_argument('--requests', type=positive, default=200,
+                            help='запросов на сценарий')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--cold', action='store_true',
+                            help='очищать кэш перед каждым запросом')
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help='сценарии прогона, по умолчанию все')
+        parser.add_argument('--json', metavar='PATH',
+                            help='записать результаты в JSON ("-" - stdout)')
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            connection.settings_dict['TEST'] = {
+                **connection.settings_dict.get('TEST', {}),
+                'NAME': os.path.join(directory, 'bench.sqlite3')}
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(CACHES=isolated_caches(directory)):
+                    report = self.bench(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        if options['json'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['json']:
+            with open(options['json'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+    def bench(self, options):
+        started = time.perf_counter()
+        rows = DataGenerator(options['seed']).generate(
+            options['users'], options['groups'], options['posts'],
+            options['comments'], options['follows'])
+        self.stderr.write(f'Данные: {rows} '
+                          f'за {time.perf_counter() - started:.1f} с')
+        cache.clear()
+        client = WSGIClient(get_wsgi_application())
+        scenarios = self.scenarios(client, random.Random(options['seed']))
+        results = {}
+        for name in options['scenario'] or SCENARIOS:
+            results[name] = self.run(client, scenarios[name],
+                                     options['requests'], options['cold'])
+            self.stderr.write(
+                f"{name:>12}: {results[name]['rps']:>8} rps "
+                f"p50={results[name]['p50']}ms p95={results[name]['p95']}ms "
+                f"p99={results[name]['p99']}ms "
+                f"queries={results[name]['queries_per_request']}")
+        return {'commit': git_commit(),
+                'created': timezone.now().isoformat(),
+                'options': {key: options[key] for key in (
+                    'users', 'groups', 'posts', 'comments', 'follows',
+                    'requests', 'seed', 'cold')},
+                'rows': rows,
+                'results': results}
+
+    def scenarios(self, client, rng):
+        """Запросы сценариев от имени читателя с подписками."""
+        reader = (Follow.objects.order_by('user')
+                  .values_list('user', flat=True).first())
+        client.login(User.objects.filter(pk=reader).first()
+                     or User.objects.order_by('pk').first())
+        client.request('GET', reverse('posts:post_create'))
+        slugs = list(Group.objects.values_list('slug', flat=True))
+        usernames = list(User.objects.values_list('username', flat=True))
+        post_ids = list(Post.objects.values_list('pk', flat=True))
+        return {
+            'index': lambda: ('GET', reverse('posts:index'), None),
+            'group_posts': lambda: (
+                'GET', reverse('posts:group_list',
+                               args=[rng.choice(slugs)]), None),
+            'profile': lambda: (
+                'GET', reverse('posts:profile',
+                               args=[rng.choice(usernames)]), None),
+            'post_detail': lambda: (
+                'GET', reverse('posts:post_detail',
+                               args=[rng.choice(post_ids)]), None),
+            'follow_index': lambda: ('GET', reverse('posts:follow_index'),
+                                     None),
+            'post_create': lambda: ('POST', reverse('posts:post_create'),
+                                    {'text': 'Пост из нагрузочного теста'}),
+            'add_comment': lambda: (
+                'POST', reverse('posts:add_comment',
+                                args=[rng.choice(post_ids)]),
+                {'text': 'Комментарий из нагрузочного теста'}),
+        }
+
+    def run(self, client, scenario, requests, cold):
+        queries = []
+        latencies = []
+        errors = 0
+
+        def count(execute, sql, params, many, context):
+            queries[-1] += 1
+            return execute(sql, params, many, context)
+
+        for number in range(WARMUP + requests):
+            method, path, data = scenario()
+            if cold:
+                cache.clear()
+            queries.append(0)
+            with connection.execute_wrapper(count):
+                request_started = time.perf_counter()
+                status = client.request(method, path, data)
+                elapsed = time.perf_counter() - request_started
+            if number < WARMUP:
+                queries.pop()
+                continue
+            latencies.append(elapsed)
+            errors += status >= 400
+        total = sum(latencies)
+        return {'requests': requests,
+                'errors': errors,
+                'rps': round(requests / total, 1) if total else 0,
+                **latency_summary(latencies),
+                'queries_per_request': round(sum(queries) / requests, 2)}
@@ -0,0 +1,31 @@
+import time
+from datetime import timedelta
+
+from core.tasks import purge_done, run_pending
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Воркер очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='выполнить готовые задачи и выйти')
+        parser.add_argument('--batch', type=int, default=100,
+                            help='задач за один проход')
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help='пауза, когда очередь пуста, в секундах')
+
+    def handle(self, *args, **options):
+        retention = timedelta(days=settings.TASK_RETENTION_DAYS)
+        while True:
+            done, failed = run_pending(options['batch'])
+            if done or failed:
+                self.stdout.write(f'Выполнено: {done}, с ошибкой: {failed}')
+            if options['once'] and done + failed < options['batch']:
+                break
+            if not done and not failed:
+                purge_done(retention)
+                time.sleep(options['sleep'])
+        purge_done(retention)
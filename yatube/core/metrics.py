@@ -0,0 +1,167 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+TIME_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000,
+                   5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин.
+
+    Наблюдение - двоичный поиск и инкремент, память не растет
+    с числом запросов; перцентили оцениваются верхней границей корзины.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+
+    def observe(self, value):
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, pct):
+        if not self.count:
+            return 0
+        rank = pct / 100 * self.count
+        seen = 0
+        for index, amount in enumerate(self.buckets):
+            seen += amount
+            if seen >= rank:
+                break
+        if index < len(self.bounds):
+            return self.bounds[index]
+        return '+Inf'
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3) if self.count else 0,
+            **{f'p{pct}': self.percentile(pct) for pct in (50, 95, 99)},
+            'buckets': {f'le_{bound}': amount for bound, amount
+                        in zip((*self.bounds, '+Inf'), self.buckets)},
+        }
+
+
+class RequestMetrics:
+    """Счетчики одного запроса; пишутся только из его контекста."""
+
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_depth',
+                 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(TIME_BUCKETS_MS)
+        self.db_time = Histogram(TIME_BUCKETS_MS)
+        self.template_time = Histogram(TIME_BUCKETS_MS)
+        self.queries = Histogram(COUNT_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def observe(self, duration, metrics):
+        self.duration.observe(duration * 1000)
+        self.db_time.observe(metrics.db_time * 1000)
+        self.template_time.observe(metrics.template_time * 1000)
+        self.queries.observe(metrics.queries)
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+
+    def snapshot(self):
+        return {'duration_ms': self.duration.snapshot(),
+                'db_ms': self.db_time.snapshot(),
+                'template_ms': self.template_time.snapshot(),
+                'queries': self.queries.snapshot(),
+                'cache': {'hits': self.cache_hits,
+                          'misses': self.cache_misses}}
+
+
+class Registry:
+    """Метрики процесса по именам view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view_name, duration, metrics):
+        with self._lock:
+            view = self._views.get(view_name)
+            if view is None:
+                view = self._views[view_name] = ViewMetrics()
+            view.observe(duration, metrics)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: view.snapshot()
+                    for name, view in sorted(self._views.items())}
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = Registry()
+
+
+def start_request():
+    """Заводит счетчики запроса; возвращает их и токен для сброса."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper: число запросов и время в базе."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+
+
+@contextmanager
+def template_timer():
+    """Время рендера; вложенные шаблоны учтены во внешнем."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += time.perf_counter() - started
+
+
+def count_cache(hits=0, misses=0):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
@@ -0,0 +1,71 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+
+from .metrics import finish_request, registry, start_request
+from .routers import pin_to_primary, unpin
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_COOKIE = 'pin_primary'
+
+logger = logging.getLogger('yatube.metrics')
+
+
+class ReplicaPinMiddleware:
+    """После записи клиент читает с основной базы REPLICA_PIN_SECONDS."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writing = request.method not in SAFE_METHODS
+        token = pin_to_primary(writing or PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin(token)
+        if writing:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
+
+
+class MetricsMiddleware:
+    """Число запросов к базе, время базы, шаблонов и кэш по каждой view.
+
+    Метрики копятся в гистограммах процесса (страница admin/metrics/)
+    и пишутся JSON-строкой в лог yatube.metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        metrics, token = start_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            finish_request(token)
+        match = request.resolver_match
+        if match is not None:
+            registry.observe(match.view_name, duration, metrics)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({
+                    'view': match.view_name,
+                    'method': request.method,
+                    'status': response.status_code,
+                    'duration_ms': round(duration * 1000, 3),
+                    'queries': metrics.queries,
+                    'db_ms': round(metrics.db_time * 1000, 3),
+                    'template_ms': round(metrics.template_time * 1000, 3),
+                    'cache_hits': metrics.cache_hits,
+                    'cache_misses': metrics.cache_misses,
+                }))
+        return response
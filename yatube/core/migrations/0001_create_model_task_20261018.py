@@ -0,0 +1,37 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='task function')),
+                ('payload', models.TextField(default='[]', verbose_name='JSON arguments')),
+                ('key', models.CharField(blank=True, max_length=200, null=True, unique=True, verbose_name='idempotency key')),
+                ('status', models.CharField(choices=[('queued', 'queued'), ('done', 'done'), ('failed', 'failed')], default='queued', max_length=10, verbose_name='status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('run_at', models.DateTimeField(verbose_name='run not before')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='worker lease')),
+                ('last_error', models.TextField(blank=True, verbose_name='last error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='created')),
+            ],
+            options={
+                'verbose_name': 'Background task',
+                'verbose_name_plural': 'Background tasks',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_at'], name='task_queue_idx'),
+        ),
+    ]
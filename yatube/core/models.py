@@ -8,3 +8,42 @@ class CreateModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class Task(models.Model):
+    """Отложенная задача; очередь - эта таблица, воркер - run_tasks."""
+    QUEUED = 'queued'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = ((QUEUED, 'queued'), (DONE, 'done'), (FAILED, 'failed'))
+
+    name = models.CharField(max_length=200, verbose_name="task function")
+    payload = models.TextField(default='[]',
+                               verbose_name="JSON arguments")
+    key = models.CharField(max_length=200,
+                           unique=True,
+                           null=True,
+                           blank=True,
+                           verbose_name="idempotency key")
+    status = models.CharField(max_length=10,
+                              choices=STATUSES,
+                              default=QUEUED,
+                              verbose_name="status")
+    attempts = models.PositiveSmallIntegerField(default=0,
+                                                verbose_name="attempts")
+    run_at = models.DateTimeField(verbose_name="run not before")
+    locked_until = models.DateTimeField(null=True,
+                                        blank=True,
+                                        verbose_name="worker lease")
+    last_error = models.TextField(blank=True, verbose_name="last error")
+    created = models.DateTimeField(auto_now_add=True,
+                                   verbose_name="created")
+
+    class Meta:
+        verbose_name = "Background task"
+        verbose_name_plural = "Background tasks"
+        indexes = [models.Index(fields=['status', 'run_at'],
+                                name='task_queue_idx')]
+
+    def __str__(self):
+        return f'{self.name} [{self.status}]'
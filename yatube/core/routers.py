@@ -0,0 +1,61 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+PRIMARY_ONLY_APPS = {'sessions', 'thumbnail'}
+
+_use_replica = ContextVar('use_replica', default=False)
+_pinned = ContextVar('pinned_to_primary', default=False)
+
+
+def pin_to_primary(pinned):
+    """Запрещает чтение с реплик до конца запроса; возвращает токен."""
+    return _pinned.set(pinned)
+
+
+def unpin(token):
+    _pinned.reset(token)
+
+
+def pinned_to_primary():
+    """Клиент недавно писал и должен видеть свои изменения."""
+    return _pinned.get()
+
+
+def reading_from_replica():
+    """Идут ли чтения текущего запроса на реплику."""
+    return bool(settings.DATABASE_REPLICAS) and _use_replica.get()
+
+
+def read_from_replica(view):
+    """Разрешает view читать с реплики, если запрос не закреплен."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _use_replica.set(not _pinned.get())
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтение лент с реплик, запись и остальное чтение - с основной базы."""
+
+    def db_for_read(self, model, **hints):
+        if (reading_from_replica()
+                and model._meta.app_label not in PRIMARY_ONLY_APPS):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY
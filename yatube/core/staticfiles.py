@@ -0,0 +1,154 @@
+import gzip
+import mimetypes
+import mmap
+import os
+import posixpath
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ('.css', '.js', '.map', '.svg', '.txt', '.json', '.ico')
+COMPRESS_MIN_SIZE = 256
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=60'
+CHUNK_SIZE = 64 * 1024
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    """collectstatic: имена с хэшем содержимого и готовые .gz/.br рядом.
+
+    Brotli пишется, если установлен пакет brotli. Пока collectstatic
+    не запускался (разработка, тесты), ссылки ведут на исходные файлы.
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if name.endswith(COMPRESSIBLE):
+                yield from self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+            yield name, name + suffix, True
+
+
+class MappedFile:
+    """Файл, отображенный в память; ответ отдается срезами без read()."""
+
+    def __init__(self, path):
+        self.size = os.path.getsize(path)
+        self.data = b''
+        if self.size:
+            with open(path, 'rb') as file:
+                self.data = mmap.mmap(file.fileno(), 0,
+                                      access=mmap.ACCESS_READ)
+
+    def chunks(self):
+        for start in range(0, self.size, CHUNK_SIZE):
+            yield self.data[start:start + CHUNK_SIZE]
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещенных через q=0."""
+    encodings = set()
+    for part in header.split(','):
+        encoding, _, params = part.partition(';')
+        try:
+            quality = float(params.partition('q=')[2] or 1)
+        except ValueError:
+            quality = 1
+        if quality > 0:
+            encodings.add(encoding.strip().lower())
+    return encodings
+
+
+class StaticFilesApp:
+    """WSGI-обертка: отдает STATIC_ROOT без прокси перед приложением.
+
+    Файлы читаются один раз при старте и отображаются в память. Имена
+    из манифеста collectstatic получают immutable-кэш на год, сжатый
+    вариант выбирается по Accept-Encoding.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = root or settings.STATIC_ROOT
+        self.prefix = prefix or settings.STATIC_URL
+        self.hashed = set(CompressedManifestStorage(
+            location=self.root).hashed_files.values())
+        self.files = self.scan()
+
+    def scan(self):
+        files = {}
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                relative = os.path.relpath(path, self.root).replace(
+                    os.sep, '/')
+                files[relative] = MappedFile(path)
+        return files
+
+    def __call__(self, environ, start_response):
+        path = unquote(environ.get('PATH_INFO', ''))
+        if (environ['REQUEST_METHOD'] not in ('GET', 'HEAD')
+                or not path.startswith(self.prefix)):
+            return self.application(environ, start_response)
+        name = posixpath.normpath(path[len(self.prefix):])
+        if name.endswith(tuple(suffix for _, suffix in ENCODINGS)):
+            name = None
+        if name not in self.files:
+            return self.application(environ, start_response)
+        return self.serve(environ, start_response, name)
+
+    def serve(self, environ, start_response, name):
+        content_type, _ = mimetypes.guess_type(name)
+        headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Cache-Control',
+             IMMUTABLE if name in self.hashed else REVALIDATE),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        accepted = accepted_encodings(
+            environ.get('HTTP_ACCEPT_ENCODING', ''))
+        mapped = self.files[name]
+        for encoding, suffix in ENCODINGS:
+            if encoding in accepted and name + suffix in self.files:
+                mapped = self.files[name + suffix]
+                headers.append(('Content-Encoding', encoding))
+                break
+        headers.append(('Content-Length', str(mapped.size)))
+        start_response('200 OK', headers)
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+        return mapped.chunks()
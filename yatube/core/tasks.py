@@ -0,0 +1,128 @@
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(max_attempts=None):
+    """Регистрирует функцию как задачу очереди.
+
+    Аргументы задачи сериализуются в JSON, поэтому передавать нужно
+    первичные ключи и строки, а не объекты моделей.
+    """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts or settings.TASK_MAX_ATTEMPTS
+        _registry[func.task_name] = func
+        return func
+    return decorator
+
+
+def get_task(name):
+    if name not in _registry:
+        import_string(name)
+    return _registry[name]
+
+
+def backoff(attempts):
+    """Пауза перед повтором: экспонента с разбросом, чтобы не толпиться."""
+    delay = min(settings.TASK_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                settings.TASK_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def enqueue(func, *args, key=None, delay=0):
+    """Ставит задачу в очередь; с TASKS_EAGER выполняет сразу.
+
+    Строка задачи пишется в текущей транзакции: воркер увидит ее только
+    после фиксации, а при откате она пропадет вместе с данными. Задача
+    с уже известным key не ставится повторно. С TASKS_EAGER (тесты)
+    ошибка задачи поднимается в вызывающий код.
+    """
+    if settings.TASKS_EAGER:
+        func(*args)
+        return
+    Task.objects.bulk_create(
+        [Task(name=func.task_name, payload=json.dumps(args), key=key,
+              run_at=timezone.now() + timedelta(seconds=delay))],
+        ignore_conflicts=key is not None)
+
+
+def claim(limit):
+    """Забирает до limit готовых задач, продлевая им аренду воркера.
+
+    Аренда ставится условным UPDATE, поэтому задачу получит только один
+    из конкурирующих воркеров; задачи упавшего воркера вернутся
+    в очередь, когда аренда истечет.
+    """
+    now = timezone.now()
+    free = Q(locked_until__isnull=True) | Q(locked_until__lt=now)
+    ready = Task.objects.filter(free, status=Task.QUEUED, run_at__lte=now)
+    candidates = (ready.order_by('run_at', 'id')
+                  .values_list('pk', flat=True)[:limit])
+    lease = now + timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    claimed = []
+    for pk in list(candidates):
+        # Задачу могли выполнить или отложить после выборки кандидатов.
+        if ready.filter(pk=pk).update(locked_until=lease):
+            claimed.append(pk)
+    return Task.objects.filter(pk__in=claimed).order_by('run_at', 'id')
+
+
+def run_task(current):
+    """Выполняет задачу; при ошибке откладывает повтор или сдается."""
+    current.attempts += 1
+    try:
+        func = get_task(current.name)
+        with transaction.atomic():
+            func(*json.loads(current.payload))
+            current.status = Task.DONE
+            current.locked_until = None
+            current.save(update_fields=['status', 'attempts',
+                                        'locked_until'])
+        return True
+    except Exception:
+        current.last_error = traceback.format_exc()
+        max_attempts = getattr(_registry.get(current.name), 'max_attempts',
+                               settings.TASK_MAX_ATTEMPTS)
+        if current.attempts >= max_attempts:
+            current.status = Task.FAILED
+            logger.error('Задача %s #%s не выполнена за %s попыток',
+                         current.name, current.pk, current.attempts)
+        else:
+            current.status = Task.QUEUED
+            current.run_at = timezone.now() + backoff(current.attempts)
+        current.locked_until = None
+        current.save(update_fields=['status', 'attempts', 'run_at',
+                                    'locked_until', 'last_error'])
+        return False
+
+
+def run_pending(limit=100):
+    """Выполняет готовые задачи; возвращает число выполненных и упавших."""
+    done = failed = 0
+    for current in claim(limit):
+        if run_task(current):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def purge_done(older_than):
+    """Удаляет выполненные задачи; их ключи снова можно ставить."""
+    return Task.objects.filter(
+        status=Task.DONE, created__lt=timezone.now() - older_than).delete()[0]
@@ -0,0 +1,74 @@
+import logging
+import os
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.utils import get_app_template_dirs
+
+from .metrics import template_timer
+
+logger = logging.getLogger('yatube.templates')
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with template_timer():
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django с учетом времени рендера в метриках запроса."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name),
+                                 self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def django_engines():
+    return [engine for engine in engines.all()
+            if isinstance(engine, DjangoTemplates)]
+
+
+def template_names(engine):
+    """Имена всех файлов в DIRS движка и в templates приложений."""
+    names = set()
+    for directory in [*engine.engine.dirs,
+                      *get_app_template_dirs('templates')]:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                names.add(os.path.relpath(os.path.join(root, name),
+                                          directory).replace(os.sep, '/'))
+    return sorted(names)
+
+
+def warm_templates():
+    """Компилирует все шаблоны в cached.Loader до первого запроса.
+
+    Возвращает число скомпилированных шаблонов; файлы, которые не
+    разбираются как шаблоны, пропускаются с предупреждением в лог.
+    """
+    compiled = 0
+    for engine in django_engines():
+        for name in template_names(engine):
+            try:
+                engine.engine.get_template(name)
+            except (TemplateSyntaxError, UnicodeDecodeError) as exc:
+                logger.warning('Шаблон %s не скомпилирован: %s', name, exc)
+                continue
+            compiled += 1
+    return compiled
+
+
+def reset_templates():
+    """Сбрасывает скомпилированные шаблоны, как в новом процессе."""
+    for engine in django_engines():
+        for loader in engine.engine.template_loaders:
+            if isinstance(loader, CachedLoader):
+                loader.reset()
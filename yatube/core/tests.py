@@ -1,6 +1,37 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.template.loaders.filesystem import Loader as FilesystemLoader
+from django.templatetags.static import static
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+from django.utils import timezone
+from posts.models import Post
+
+from .cache_backends import SQLiteCache
+from .metrics import COUNT_BUCKETS, Histogram, registry
+from .middleware import PIN_COOKIE, ReplicaPinMiddleware
+from .models import Task
+from .routers import ReplicaRouter, read_from_replica
+from .staticfiles import StaticFilesApp
+from .tasks import claim, enqueue, run_pending, task
+from .template_backends import reset_templates, warm_templates
 
 
 class CoreTests(TestCase):
@@ -13,3 +44,379 @@ class CoreTests(TestCase):
         self.assertTemplateUsed(
             response, 'core/404.html',
             'Ошибка шаблона при вызове несуществующей страницы')
+
+
+class SQLiteProfileTests(TestCase):
+    def test_pragmas_applied(self):
+        """Соединение SQLite настроено по профилю из settings."""
+        expected = {'busy_timeout': 5000, 'synchronous': 1}
+
+        with connection.cursor() as cursor:
+            for pragma, value in expected.items():
+                with self.subTest(pragma=pragma):
+                    cursor.execute(f'PRAGMA {pragma}')
+
+                    self.assertEqual(cursor.fetchone()[0], value,
+                                     f'PRAGMA {pragma} не применена')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, model=Post):
+        """Базы чтения и записи, выбранные внутри view ленты."""
+        @read_from_replica
+        def view(request):
+            return HttpResponse(' '.join((
+                self.router.db_for_read(model),
+                self.router.db_for_write(model))))
+
+        middleware = ReplicaPinMiddleware(view)
+        return middleware(request)
+
+    def test_feed_reads_from_replica(self):
+        """Лента читается с реплики, запись идет в основную базу."""
+        response = self.route(self.factory.get('/'))
+
+        self.assertEqual(response.content, b'replica1 default')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_outside_feed_use_primary(self):
+        """Вне лент и для сессий чтение идет в основную базу."""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(
+            self.route(self.factory.get('/'), Session).content,
+            b'default default')
+
+    def test_write_pins_to_primary(self):
+        """После POST клиент читает с основной базы по cookie."""
+        response = self.route(self.factory.post('/'))
+
+        self.assertEqual(response.content, b'default default')
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.route(request).content, b'default default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без настроенных реплик все идет в основную базу."""
+        self.assertEqual(self.route(self.factory.get('/')).content,
+                         b'default default')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        author = get_user_model().objects.create_user(username='auth')
+        Post.objects.create(author=author, text='Пост')
+
+    def test_view_metrics(self):
+        """Запросы, время базы и шаблонов, кэш учтены по имени view."""
+        with self.assertLogs('yatube.metrics', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+            self.client.get(reverse('posts:index'))
+
+        index = registry.snapshot()['posts:index']
+        self.assertEqual(index['duration_ms']['count'], 2)
+        self.assertGreater(index['queries']['mean'], 0)
+        self.assertGreater(index['db_ms']['mean'], 0)
+        self.assertGreater(index['template_ms']['mean'], 0)
+        self.assertEqual(index['cache'], {'hits': 1, 'misses': 2},
+                         'Промах страницы и карточки, затем попадание')
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'posts:index')
+        self.assertEqual(line['status'], HTTPStatus.OK)
+
+    def test_endpoint_for_staff_only(self):
+        """Страница метрик доступна только персоналу."""
+        self.client.get(reverse('posts:index'))
+        url = reverse('metrics')
+
+        self.assertEqual(self.client.get(url).status_code, HTTPStatus.FOUND)
+
+        admin = get_user_model().objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('posts:index', response.json())
+
+    def test_histogram_percentiles(self):
+        """Перцентили оцениваются по границам корзин."""
+        histogram = Histogram(COUNT_BUCKETS)
+        for value in (1, 1, 2, 4, 200):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.percentile(40), 1)
+        self.assertEqual(histogram.percentile(80), 5)
+        self.assertEqual(histogram.percentile(99), '+Inf')
+
+
+calls = []
+
+
+@task(max_attempts=2)
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode(value):
+    calls.append(value)
+    raise RuntimeError('сбой задачи')
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_and_run(self):
+        """Задача выполняется воркером, а не при постановке."""
+        enqueue(remember, 1)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertEqual(calls, [1])
+        self.assertEqual(Task.objects.get().status, Task.DONE)
+        self.assertEqual(run_pending(), (0, 0))
+
+    def test_idempotent_key(self):
+        """Задача с тем же ключом ставится один раз."""
+        enqueue(remember, 1, key='same')
+        enqueue(remember, 2, key='same')
+        run_pending()
+
+        self.assertEqual(calls, [1])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_raises(self):
+        """В режиме TASKS_EAGER ошибка задачи видна вызывающему коду."""
+        with self.assertRaisesMessage(RuntimeError, 'сбой задачи'):
+            enqueue(explode, 1)
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(Task.objects.exists())
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача откладывается и после попыток помечается failed."""
+        enqueue(explode, 1)
+
+        self.assertEqual(run_pending(), (0, 1))
+        queued = Task.objects.get()
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn('сбой задачи', queued.last_error)
+        self.assertEqual(run_pending(), (0, 0), 'Повтор до паузы')
+
+        Task.objects.update(run_at=timezone.now())
+        run_pending()
+
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+        self.assertEqual(calls, [1, 1])
+
+    def test_expired_lease(self):
+        """Задачу упавшего воркера забирают после конца аренды."""
+        enqueue(remember, 1)
+
+        self.assertEqual(len(claim(10)), 1)
+        self.assertEqual(len(claim(10)), 0, 'Задачу взяли два воркера')
+        Task.objects.update(locked_until=timezone.now())
+        self.assertEqual(len(claim(10)), 1)
+
+    def test_claim_skips_finished(self):
+        """Задачу, выполненную после выборки кандидатов, не берут снова."""
+        enqueue(remember, 1)
+        enqueue(remember, 2)
+
+        def finish_after_select(candidates):
+            selected = [*candidates]
+            Task.objects.filter(payload='[1]').update(status=Task.DONE)
+            Task.objects.filter(payload='[2]').update(
+                run_at=timezone.now() + timedelta(minutes=1))
+            return selected
+
+        with mock.patch('core.tasks.list', finish_after_select, create=True):
+            self.assertEqual(len(claim(10)), 0, 'Задачу выполнят дважды')
+
+    def test_worker_command(self):
+        """run_tasks --once выполняет очередь и выходит."""
+        post = Post.objects.create(
+            author=get_user_model().objects.create_user(username='auth'),
+            text='Пост для рассылки по лентам')
+
+        self.assertTrue(Task.objects.filter(key=f'fan-out:{post.pk}')
+                        .exists())
+        call_command('run_tasks', once=True, stdout=StringIO())
+
+        self.assertFalse(Task.objects.exclude(status=Task.DONE).exists())
+
+
+class CacheBackendTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = os.path.join(directory.name, 'cache.sqlite3')
+        self.settings = override_settings(CACHES={
+            'shared': {'BACKEND': 'core.cache_backends.SQLiteCache',
+                       'LOCATION': self.location},
+            'default': {'BACKEND': 'core.cache_backends.TieredCache',
+                        'LOCATION': 'shared',
+                        'OPTIONS': {'LOCAL_EXCLUDE': ['version:'],
+                                    'COALESCE': True}}})
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        caches['default'].clear()
+
+    def test_sqlite_shared_between_instances(self):
+        """Запись одного экземпляра видна другому, как другому процессу."""
+        first = SQLiteCache(self.location, {})
+        second = SQLiteCache(self.location, {})
+        first.set_many({'a': 1, 'b': [2]})
+
+        self.assertEqual(second.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': [2]})
+        self.assertFalse(second.add('a', 10))
+        self.assertEqual(second.incr('a', 5), 6)
+        self.assertEqual(first.get('a'), 6)
+
+        first.set('short', 1, 0)
+        self.assertIsNone(second.get('short'), 'Истекший ключ отдан')
+        self.assertTrue(second.add('short', 2))
+        second.delete('b')
+        self.assertIsNone(first.get('b'))
+        with self.assertRaises(ValueError):
+            first.incr('missing')
+
+    def test_tiered_local_copy(self):
+        """Попадание хранится в памяти процесса, версии читаются из общего."""
+        tiered = caches['default']
+        tiered.set('page', 'html')
+        tiered.set('version:index', 1)
+        caches['shared'].set_many({'page': 'new html', 'version:index': 2})
+
+        self.assertEqual(tiered.get('page'), 'html')
+        self.assertEqual(tiered.get_many(['page', 'version:index']),
+                         {'page': 'html', 'version:index': 2})
+
+        tiered.local.clear()
+        self.assertEqual(tiered.get('page'), 'new html')
+
+    def test_tiered_coalescing(self):
+        """Одновременные промахи процесса дают одно чтение общего кэша."""
+        tiered = caches['default']
+        caches['shared'].set('page', 'html')
+        reads = []
+        release = threading.Event()
+
+        def slow_get(key, default=None, version=None):
+            reads.append(key)
+            release.wait(5)
+            return 'html'
+
+        results = []
+
+        def read():
+            results.append(tiered.get('page'))
+
+        with mock.patch.object(tiered.shared, 'get', slow_get):
+            threads = [threading.Thread(target=read) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            while not reads:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            release.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(reads, ['page'])
+        self.assertEqual(results, ['html'] * 5)
+
+
+class StaticFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.root = cls.directory.name
+        with override_settings(STATIC_ROOT=cls.root):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            cls.url = static('css/bootstrap.min.css')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def request(self, path, **environ):
+        fallback = mock.Mock(return_value=[b'django'])
+        app = StaticFilesApp(fallback, root=self.root, prefix='/static/')
+        response = {}
+
+        def start_response(status, headers):
+            response.update(headers, status=status)
+
+        body = b''.join(app({'REQUEST_METHOD': 'GET', 'PATH_INFO': path,
+                             **environ}, start_response))
+        return response, body, fallback
+
+    def test_collectstatic_hashed_and_compressed(self):
+        """collectstatic пишет имена с хэшем и сжатые варианты."""
+        self.assertRegex(self.url,
+                         r'^/static/css/bootstrap\.min\.\w{12}\.css$')
+        path = os.path.join(self.root, self.url[len('/static/'):])
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as packed:
+            self.assertEqual(packed.read(), original.read())
+
+    def test_serve_compressed_immutable(self):
+        """Файл с хэшем отдается сжатым и с кэшем на год."""
+        response, body, _ = self.request(
+            self.url, HTTP_ACCEPT_ENCODING='br;q=0, gzip, deflate')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(int(response['Content-Length']), len(body))
+        with open(os.path.join(self.root, 'css/bootstrap.min.css'),
+                  'rb') as original:
+            self.assertEqual(gzip.decompress(body), original.read())
+
+    def test_serve_plain_and_fallback(self):
+        """Без Accept-Encoding - исходный файл; прочие пути - в Django."""
+        response, body, _ = self.request('/static/css/bootstrap.min.css')
+
+        self.assertNotIn('Content-Encoding', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(int(response['Content-Length']), len(body))
+
+        for path in ('/', '/static/missing.css', '/static/../manage.py',
+                     self.url + '.gz'):
+            with self.subTest(path=path):
+                _, body, fallback = self.request(path)
+                self.assertEqual(body, b'django')
+                fallback.assert_called_once()
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def test_warm_and_reset(self):
+        """После прогрева шаблоны берутся из памяти, без чтения файлов."""
+        reset_templates()
+        self.assertGreater(warm_templates(), 0)
+
+        with mock.patch.object(FilesystemLoader, 'get_contents') as read:
+            get_template('includes/post.html')
+            get_template('admin/base_site.html')
+        read.assert_not_called()
+
+        reset_templates()
+        with mock.patch.object(FilesystemLoader, 'get_contents',
+                               return_value='') as read:
+            get_template('includes/post.html')
+        read.assert_called_once()
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Comment, Follow, Group, Post
+from .search import match_posts
 
 
 @admin.register(Post)
@@ -11,6 +12,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date', 'group')
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу FTS5 вместо LIKE по всей таблице."""
+        if not search_term.strip():
+            return queryset, False
+        return match_posts(queryset, search_term), False
+
 
 admin.site.register(Group)
 admin.site.register(Comment)
@@ -0,0 +1,322 @@
+import hashlib
+import math
+import random
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from core.metrics import count_cache
+from core.routers import pinned_to_primary, reading_from_replica
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from .fragments import fill_fragments
+from .models import Post
+
+# Версию, поднятую в кэше процесса (locmem), не видят другие воркеры:
+# там версии, страницы и карточки живут LOCAL_CACHE_TIMEOUT секунд.
+SHARED_CACHE = settings.CACHE_BACKEND != 'locmem'
+LOCAL_CACHE_TIMEOUT = 20
+PAGE_CACHE_TIMEOUT = 60 * 60 * 6 if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+CARD_CACHE_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+VERSION_TIMEOUT = None if SHARED_CACHE else LOCAL_CACHE_TIMEOUT
+# Сколько секунд после изменения можно отдавать прошлую версию страницы,
+# пока ее пересчитывает другой запрос.
+STALE_GRACE = 10
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 2
+LOCK_POLL = 0.05
+EARLY_REFRESH_BETA = 1
+PAGE_KEY = 'page:{}:{}:{}'
+PAGE_LOCK_KEY = 'page-lock:{}'
+VERSION_KEY = 'version:{}'
+POST_AUTHOR_KEY = 'post-author:{}'
+GROUPS_SCOPE = 'groups'
+INDEX_SCOPE = 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def author_card_scope(username):
+    """Имя автора в карточках его постов; меняется только с профилем."""
+    return f'author-card:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def get_versions(scopes):
+    """Текущие версии областей; отсутствующие заводятся заново."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            now = time.time_ns()
+            cache.add(key, now, VERSION_TIMEOUT)
+            versions[key] = cache.get(key, now)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Делает устаревшими все страницы, зависящие от областей.
+
+    Версия - время последнего изменения области в наносекундах, поэтому
+    по ней же строится Last-Modified страницы.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    now = time.time_ns()
+    cache.set_many({key: max(now, current.get(key, 0) + 1) for key in keys},
+                   VERSION_TIMEOUT)
+
+
+def post_author(post_id):
+    """Автор поста для ключа страницы без обращения к базе при попадании."""
+    key = POST_AUTHOR_KEY.format(post_id)
+    username = cache.get(key)
+    if username is None:
+        username = (Post.objects.filter(pk=post_id)
+                    .values_list('author__username', flat=True).first())
+        if username is not None:
+            cache.set(key, username, None)
+    return username
+
+
+def index_scopes():
+    return [INDEX_SCOPE]
+
+
+def group_scopes(slug):
+    return [group_scope(slug)]
+
+
+def profile_scopes(username):
+    return [author_scope(username)]
+
+
+def post_detail_scopes(post_id):
+    username = post_author(post_id)
+    if username is None:
+        return [post_scope(post_id)]
+    return [post_scope(post_id), author_scope(username)]
+
+
+def early_refresh(refresh_at, render_time):
+    """Вероятностный досрочный пересчет (XFetch).
+
+    Чем ближе срок страницы и чем дольше ее рендер, тем вероятнее, что
+    очередной запрос пересчитает ее заранее, не дожидаясь промаха.
+    """
+    return (time.time() - render_time * EARLY_REFRESH_BETA
+            * math.log(1 - random.random())) >= refresh_at
+
+
+def page_variant(request):
+    """Гостям без сессии - готовая страница, остальным - общая заготовка.
+
+    В заготовке вместо частей, зависящих от пользователя, стоят метки
+    фрагментов; их заполняет каждый запрос.
+    """
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return 'shell'
+    return 'anon'
+
+
+def page_key(request, prefix):
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return PAGE_KEY.format(prefix, page_variant(request), url)
+
+
+def wait_for_page(cache_key):
+    """Ждет, пока страницу отрендерит запрос, взявший блокировку."""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(cache_key)
+        if entry is not None:
+            return entry[0]
+    return None
+
+
+def without_validators(response):
+    """Отдать ответ без ETag и Last-Modified.
+
+    Валидаторы строятся по текущим версиям областей; страница, которая
+    может не содержать последних изменений, с ними подтверждалась бы
+    ответом 304 до следующего изменения.
+    """
+    response.without_validators = True
+    return response
+
+
+def stale_page(stale_key, changed):
+    """Прошлая версия страницы, если она устарела не дольше STALE_GRACE.
+
+    Клиенту, который только что писал, старая страница не отдается;
+    остальным она уходит без валидаторов текущей версии.
+    """
+    if pinned_to_primary():
+        return None
+    entry = cache.get(stale_key)
+    if entry is None:
+        return None
+    response, refresh_at, _, entry_changed = entry
+    stale_since = changed if changed > entry_changed else refresh_at
+    if time.time() - stale_since <= STALE_GRACE:
+        return without_validators(response)
+    return None
+
+
+def replica_may_lag(changed):
+    """Страница читается с реплики, которая могла не получить изменение.
+
+    Версию поднимает запись в основную базу; дольше REPLICA_PIN_SECONDS
+    реплика не отстает, см. ReplicaPinMiddleware.
+    """
+    return (reading_from_replica()
+            and time.time() - changed <= settings.REPLICA_PIN_SECONDS)
+
+
+def store_page(response, keys, timeout, render_time, changed):
+    """Кладет страницу под ключ версий и под ключ прошлой версии."""
+    if replica_may_lag(changed):
+        return
+    cache_key, stale_key = keys
+    # Реплика может отставать: такую страницу держим недолго.
+    if reading_from_replica():
+        timeout = min(timeout, settings.REPLICA_PAGE_CACHE_TIMEOUT)
+    entry = (response, time.time() + timeout, render_time, changed)
+    cache.set(cache_key, entry, timeout)
+    cache.set(stale_key, entry, timeout + STALE_GRACE)
+
+
+def serve_page(request, response):
+    """Заполняет фрагменты пользователя в общей заготовке страницы."""
+    if getattr(request, 'defer_fragments', False) and not response.streaming:
+        fill_fragments(request, response)
+    return response
+
+
+def render_page(request, view, args, kwargs, changed):
+    started = time.perf_counter()
+    response = view(request, *args, **kwargs)
+    if replica_may_lag(changed):
+        without_validators(response)
+    return response, time.perf_counter() - started
+
+
+def cache_page_versioned(scopes, timeout=PAGE_CACHE_TIMEOUT):
+    """Кэширует страницу под ключом из версий затронутых ею областей.
+
+    Страница живет в кэше долго и устаревает сразу, как только сигнал
+    модели поднимет версию одной из ее областей. Пересчитывает страницу
+    один запрос (single-flight); остальные в это время получают прошлую
+    версию страницы, если она устарела недавно, или ждут результата.
+    Вошедшие пользователи делят одну заготовку страницы, см. page_variant.
+    """
+    def decorator(view):
+        stale_prefix = f'{view.__name__}.stale'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            versions = page_versions(request, scopes, kwargs)
+            changed = max(versions) / 1e9
+            cache_key = page_key(request, '.'.join([view.__name__,
+                                                    *map(str, versions)]))
+            request.defer_fragments = page_variant(request) == 'shell'
+            entry = cache.get(cache_key)
+            if entry is not None and not early_refresh(*entry[1:3]):
+                count_cache(hits=1)
+                return serve_page(request, entry[0])
+            lock_key = PAGE_LOCK_KEY.format(
+                hashlib.md5(cache_key.encode()).hexdigest())
+            stale_key = page_key(request, stale_prefix)
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if not locked:
+                response = (entry[0] if entry is not None
+                            else stale_page(stale_key, changed)
+                            or wait_for_page(cache_key))
+                if response is not None:
+                    count_cache(hits=1)
+                    return serve_page(request, response)
+            count_cache(misses=1)
+            try:
+                response, render_time = render_page(request, view, args,
+                                                    kwargs, changed)
+                patch_vary_headers(response, ('Cookie',))
+                if (request.method == 'GET' and not response.streaming
+                        and response.status_code == 200
+                        and (request.COOKIES or not response.cookies)):
+                    store_page(response, (cache_key, stale_key), timeout,
+                               render_time, changed)
+                return serve_page(request, response)
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+        return wrapper
+    return decorator
+
+
+def page_versions(request, scopes, kwargs):
+    """Версии областей страницы, один раз на запрос."""
+    if not hasattr(request, '_page_versions'):
+        request._page_versions = get_versions([GROUPS_SCOPE,
+                                               *scopes(**kwargs)])
+    return request._page_versions
+
+
+def conditional_page(scopes):
+    """ETag и Last-Modified из версий областей страницы.
+
+    Валидаторы не требуют запросов к базе: версии поднимают сигналы при
+    любом изменении области, включая удаления, которых не видно
+    по max(updated). Неизменная страница отдается ответом 304 до поиска
+    в кэше и рендера шаблонов. Last-Modified есть только у страницы
+    гостя: по дате нельзя отличить страницу до входа от страницы после.
+    """
+    def etag(request, **kwargs):
+        versions = page_versions(request, scopes, kwargs)
+        # Сессия определяет, кто смотрит страницу, без запроса к базе.
+        viewer = request.COOKIES.get(settings.SESSION_COOKIE_NAME, '')
+        key = ':'.join(map(str, (request.get_full_path(), viewer,
+                                 *versions)))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        if page_variant(request) != 'anon':
+            return None
+        changed = max(page_versions(request, scopes, kwargs))
+        return datetime.fromtimestamp(changed / 1e9, timezone.utc)
+
+    def decorator(view):
+        conditional = condition(etag_func=etag,
+                                last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if getattr(response, 'without_validators', False):
+                del response['ETag']
+                del response['Last-Modified']
+            # Ответ 304 тоже зависит от того, кто смотрит страницу.
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
+
+
+def post_card_key(post, variant, groups_version, author_version):
+    """Ключ карточки поста: меняется вместе с постом, автором и группами."""
+    return (f'post-card:{variant}:{groups_version}:{author_version}:'
+            f'{post.pk}:{post.updated.timestamp():.6f}')
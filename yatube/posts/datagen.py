@@ -0,0 +1,205 @@
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+from .search import deferred_index
+from .stats import recount_comments
+from .timeline import backfill_follows
+
+BATCH_SIZE = 5000
+PASSWORD = 'yatube'
+SENTENCES = 1000
+HISTORY = timedelta(days=365)
+# Конец истории по умолчанию у seed: данные не зависят от дня запуска.
+EPOCH = datetime(2026, 1, 1, tzinfo=timezone.utc)
+FOLLOW_ROUNDS = 20
+
+
+def bulk_insert(model, objects, batch_size=BATCH_SIZE):
+    """Пишет объекты пачками, не держа весь поток в памяти."""
+    objects = iter(objects)
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return
+        model.objects.bulk_create(batch)
+
+
+def insert_rows(model, columns, rows, batch_size=BATCH_SIZE):
+    """Пишет кортежи значений через executemany, минуя экземпляры моделей.
+
+    Для миллионов строк построение объектов и SQL в bulk_create стоит
+    на порядок дороже самой вставки.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    names = ', '.join(connection.ops.quote_name(model._meta.get_field(
+        column).column) for column in columns)
+    marks = ', '.join(['%s'] * len(columns))
+    sql = f'INSERT INTO {table} ({names}) VALUES ({marks})'
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            cursor.executemany(sql, batch)
+
+
+def new_pks(model, after_pk):
+    return list(model.objects.filter(pk__gt=after_pk).order_by('pk')
+                .values_list('pk', flat=True))
+
+
+def last_pk(model):
+    return (model.objects.order_by('-pk')
+            .values_list('pk', flat=True).first() or 0)
+
+
+def power_law(count, alpha, rng):
+    """Накопленные веса закона Ципфа с рангами в случайном порядке.
+
+    alpha=0 - равномерное распределение. Ранги перемешаны, чтобы
+    самые активные авторы и самые популярные не совпадали по номеру.
+    """
+    ranks = list(range(1, count + 1))
+    rng.shuffle(ranks)
+    return list(accumulate(rank ** -alpha for rank in ranks))
+
+
+class DataGenerator:
+    """Массовая загрузка пользователей, групп, постов и подписок.
+
+    Тексты собираются из заранее созданных Faker предложений, поэтому
+    генерация дешева и при одном seed и now дает одинаковые данные.
+    Число постов у автора, подписчиков у автора и комментариев у поста
+    распределены по закону Ципфа с показателями из alphas.
+    """
+
+    def __init__(self, seed=0, batch_size=BATCH_SIZE, now=None,
+                 posts_alpha=0, followers_alpha=0, comments_alpha=0):
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.batch_size = batch_size
+        self.sentences = [self.fake.sentence() for _ in range(SENTENCES)]
+        self.now = now or timezone.now()
+        self.posts_alpha = posts_alpha
+        self.followers_alpha = followers_alpha
+        self.comments_alpha = comments_alpha
+
+    def text(self, low, high):
+        return ' '.join(self.random.choices(self.sentences,
+                                            k=self.random.randint(low, high)))
+
+    def moments(self, count):
+        """Моменты публикации в пределах HISTORY по возрастанию.
+
+        Строки идут в порядке дат, как в живой базе: id растет вместе
+        с pub_date, а индексы по дате дописываются в конец.
+        """
+        ages = sorted((self.random.random() for _ in range(count)),
+                      reverse=True)
+        for age in ages:
+            yield connection.ops.adapt_datetimefield_value(
+                self.now - HISTORY * age)
+
+    def insert(self, model, objects):
+        bulk_insert(model, objects, self.batch_size)
+
+    def users(self, count):
+        before = last_pk(User)
+        password = make_password(PASSWORD)
+        self.insert(User, (
+            User(username=f'{self.fake.user_name()}_{before + number}',
+                 first_name=self.fake.first_name(),
+                 last_name=self.fake.last_name(),
+                 password=password)
+            for number in range(count)))
+        return new_pks(User, before)
+
+    def groups(self, count):
+        before = last_pk(Group)
+        self.insert(Group, (
+            Group(title=f'{self.fake.catch_phrase()} {before + number}',
+                  slug=f'group-{before + number}',
+                  description=self.text(1, 3))
+            for number in range(count)))
+        return new_pks(Group, before)
+
+    def posts(self, count, authors, groups):
+        if not authors:
+            return []
+        before = last_pk(Post)
+        written = Counter()
+        group_choices = groups + [None]
+        weights = power_law(len(authors), self.posts_alpha, self.random)
+
+        def build():
+            for author, pub_date in zip(
+                    self.random.choices(authors, cum_weights=weights, k=count),
+                    self.moments(count)):
+                written[author] += 1
+                yield (author, self.random.choice(group_choices),
+                       self.text(1, 6), '', pub_date, pub_date, 0)
+
+        insert_rows(Post, ('author', 'group', 'text', 'image', 'pub_date',
+                           'updated', 'comment_count'), build(),
+                    self.batch_size)
+        self.insert(AuthorStats, (
+            AuthorStats(user_id=author, posts_count=written[author])
+            for author in authors))
+        return new_pks(Post, before)
+
+    def comments(self, count, posts, authors):
+        if not posts or not authors:
+            return 0
+        weights = power_law(len(posts), self.comments_alpha, self.random)
+        insert_rows(Comment, ('post', 'author', 'text', 'pub_date'), (
+            (post, author, self.text(1, 2), pub_date)
+            for post, author, pub_date in zip(
+                self.random.choices(posts, cum_weights=weights, k=count),
+                self.random.choices(authors, k=count),
+                self.moments(count))), self.batch_size)
+        recount_comments()
+        return count
+
+    def follows(self, count, users):
+        count = min(count, len(users) * (len(users) - 1))
+        weights = power_law(len(users), self.followers_alpha, self.random)
+        pairs = set()
+        # Популярные авторы быстро набирают всех читателей, и их пары
+        # начинают повторяться; число раундов добора ограничено.
+        for _ in range(FOLLOW_ROUNDS):
+            need = count - len(pairs)
+            if not need:
+                break
+            authors = self.random.choices(users, cum_weights=weights, k=need)
+            readers = self.random.choices(users, k=need)
+            for user, author in zip(readers, authors):
+                if user != author:
+                    pairs.add((user, author))
+                    if len(pairs) == count:
+                        break
+        before = last_pk(Follow)
+        self.insert(Follow, (Follow(user_id=user, author_id=author)
+                             for user, author in sorted(pairs)))
+        return len(pairs), backfill_follows(before)
+
+    def generate(self, users, groups, posts, comments, follows):
+        """Создает данные в одной транзакции; возвращает число строк."""
+        with transaction.atomic(), deferred_index():
+            user_pks = self.users(users)
+            group_pks = self.groups(groups)
+            post_pks = self.posts(posts, user_pks, group_pks)
+            comments = self.comments(comments, post_pks, user_pks)
+            follows, timeline = self.follows(follows, user_pks)
+        return {'users': len(user_pks), 'groups': len(group_pks),
+                'posts': len(post_pks), 'comments': comments,
+                'follows': follows, 'timeline': timeline}
@@ -0,0 +1,48 @@
+from urllib.parse import quote
+
+from django.urls import reverse
+from django.utils.http import RFC3986_SUBDELIMS
+
+from .models import Post
+
+# Поля, которые читает карточка поста includes/post.html.
+CARD_FIELDS = ('id', 'text', 'image', 'pub_date', 'updated',
+               'comment_count', 'last_comment_at', 'author__username',
+               'author__first_name', 'author__last_name', 'group__slug',
+               'group__title')
+URL_PLACEHOLDER = {'int': 2147483647, 'str': 'url-placeholder'}
+URL_SAFE = RFC3986_SUBDELIMS + '~:@'
+
+
+def feed_posts(queryset=None):
+    """Посты ленты с автором и группой одним запросом, без лишних колонок.
+
+    Общий для всех лент: после него рендер страницы карточек
+    не обращается к базе.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    return queryset.select_related('author', 'group').only(*CARD_FIELDS)
+
+
+class UrlTemplate:
+    """reverse() один раз, дальше - подстановка значения в строку."""
+
+    def __init__(self, name, kind):
+        self.placeholder = str(URL_PLACEHOLDER[kind])
+        self.url = reverse(name, args=[URL_PLACEHOLDER[kind]])
+
+    def __call__(self, value):
+        return self.url.replace(self.placeholder,
+                                quote(str(value), safe=URL_SAFE))
+
+
+def card_urls(posts):
+    """Проставляет постам ссылки карточки пачкой, без reverse на каждый."""
+    profile = UrlTemplate('posts:profile', 'str')
+    detail = UrlTemplate('posts:post_detail', 'int')
+    group = UrlTemplate('posts:group_list', 'str')
+    for post in posts:
+        post.profile_url = profile(post.author.username)
+        post.detail_url = detail(post.pk)
+        post.group_url = group(post.group.slug) if post.group_id else None
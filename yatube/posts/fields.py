@@ -0,0 +1,17 @@
+from django.db import models
+from django.db.models import Lookup
+
+
+class SearchField(models.TextField):
+    """Колонка полнотекстового индекса SQLite FTS5."""
+
+
+@SearchField.register_lookup
+class Match(Lookup):
+    """Условие MATCH по колонке FTS5: text__match='"слово"*'."""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
@@ -0,0 +1,66 @@
+import re
+
+from django.template.loader import render_to_string
+
+from .forms import CommentForm
+
+MARKER = '<!--fragment {}-->'
+FRAGMENT = re.compile(r'<!--fragment (\w+)((?: [^ >]+)*)-->')
+
+_fragments = {}
+
+
+def fragment(name, template):
+    """Регистрирует фрагмент страницы, зависящий от пользователя.
+
+    Функция получает request и аргументы из шаблона и возвращает
+    контекст для template.
+    """
+    def decorator(func):
+        _fragments[name] = (template, func)
+        return func
+    return decorator
+
+
+def render_fragment(request, name, *args):
+    template, get_context = _fragments[name]
+    return render_to_string(template, get_context(request, *args), request)
+
+
+def marker(name, *args):
+    return MARKER.format(' '.join(map(str, (name, *args))))
+
+
+def fill_fragments(request, response):
+    """Подставляет в общую страницу фрагменты текущего пользователя."""
+    content = response.content.decode(response.charset)
+    response.content = FRAGMENT.sub(
+        lambda match: render_fragment(request, match[1], *match[2].split()),
+        content)
+    return response
+
+
+@fragment('nav', 'includes/nav_user.html')
+def nav(request):
+    return {}
+
+
+@fragment('switcher', 'includes/switcher.html')
+def switcher(request):
+    return {}
+
+
+@fragment('follow', 'includes/follow_button.html')
+def follow_button(request, username):
+    # profile уже знает ответ, если страница рендерится в этом запросе.
+    following = getattr(request, 'follow_state', {}).get(username)
+    if following is None and request.user.is_authenticated:
+        following = request.user.follower.filter(
+            author__username=username).exists()
+    return {'username': username, 'following': following}
+
+
+@fragment('post_actions', 'includes/post_actions.html')
+def post_actions(request, post_id, username):
+    return {'post_id': int(post_id), 'username': username,
+            'form': CommentForm()}
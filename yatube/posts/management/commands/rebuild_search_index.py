@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from posts.models import PostSearch
+from posts.search import full_text_available, install_triggers, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает полнотекстовый индекс постов и его триггеры'
+
+    def handle(self, *args, **options):
+        if not full_text_available():
+            raise CommandError('Полнотекстовый индекс есть только у SQLite')
+        with transaction.atomic():
+            install_triggers()
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в индексе: {PostSearch.objects.count()}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.models import Timeline
+from posts.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок всех пользователей с нуля'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_timelines()
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {Timeline.objects.count()}'))
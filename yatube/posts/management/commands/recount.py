@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts.signals import invalidate_posts
+from posts.stats import recount_all, recount_comments
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счетчики постов авторов '
+            'и комментариев постов')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount_all()
+            fixed_comments = recount_comments()
+        # Счетчик комментариев виден в карточках лент.
+        if fixed_comments:
+            invalidate_posts(fixed_comments)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счетчиков: {fixed}, '
+            f'счетчиков комментариев: {len(fixed_comments)}'))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts.cache import GROUPS_SCOPE, bump
+from posts.models import Post
+from posts.thumbnails import generate_thumbnails, get_executor
+
+
+class Command(BaseCommand):
+    help = 'Заранее создает миниатюры для изображений существующих постов'
+
+    def handle(self, *args, **options):
+        images = (Post.objects.exclude(image='').order_by()
+                  .values_list('image', flat=True))
+        if settings.POST_THUMBNAIL_WORKERS:
+            done = get_executor().map(generate_thumbnails,
+                                      images.iterator(), chunksize=16)
+        else:
+            done = map(generate_thumbnails, images.iterator())
+        total = sum(1 for _ in done)
+        # Версия групп входит в ключи всех страниц и карточек.
+        bump(GROUPS_SCOPE)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {total}'))
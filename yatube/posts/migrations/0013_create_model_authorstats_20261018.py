@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_posts_count(apps, schema_editor):
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post = apps.get_model('posts', 'Post')
+    totals = (Post.objects.order_by().values('author')
+              .annotate(total=models.Count('pk'))
+              .values_list('author', 'total'))
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=author_id, posts_count=total)
+         for author_id, total in totals),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0012_create_model_timeline_20261018'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='author')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='posts count')),
+            ],
+            options={
+                'verbose_name': 'Author statistics',
+                'verbose_name_plural': 'Authors statistics',
+            },
+        ),
+        migrations.RunPython(fill_posts_count, migrations.RunPython.noop),
+    ]
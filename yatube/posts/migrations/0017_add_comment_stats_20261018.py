@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:30
+
+from django.db import migrations, models
+
+
+def fill_comment_stats(apps, schema_editor):
+    Comment = apps.get_model('posts', 'Comment')
+    Post = apps.get_model('posts', 'Post')
+    comments = (Comment.objects.filter(post=models.OuterRef('pk'))
+                .order_by().values('post'))
+    Post.objects.filter(comments__isnull=False).update(
+        comment_count=models.Subquery(
+            comments.annotate(total=models.Count('pk')).values('total')),
+        last_comment_at=models.Subquery(
+            comments.annotate(last=models.Max('pub_date')).values('last')))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_create_model_postsearch_20261018'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего комментария'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-comment_count', '-id'], name='post_discussed_idx'),
+        ),
+        migrations.RunPython(fill_comment_stats, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,34 @@
+import threading
+from contextlib import contextmanager
+
 from core.models import CreateModel
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .fields import SearchField
+
 User = get_user_model()
 
+# Посты, которые удаляются в этом потоке вместе с комментариями.
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@contextmanager
+def marked_deleting(post_ids):
+    """Помечает посты на время удаления; пометка снимается и при ошибке."""
+    marked = set(post_ids) - deleting_posts()
+    deleting_posts().update(marked)
+    try:
+        yield
+    finally:
+        deleting_posts().difference_update(marked)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200,
@@ -20,6 +45,12 @@ class Group(models.Model):
         verbose_name_plural = "Groups of post"
 
 
+class PostQuerySet(models.QuerySet):
+    def delete(self):
+        with marked_deleting(self.values_list('pk', flat=True)):
+            return super().delete()
+
+
 class Post(CreateModel):
     text = models.TextField(verbose_name="Текст поста",
                             help_text="Текст нового поста")
@@ -38,15 +69,34 @@ class Post(CreateModel):
     image = models.ImageField(verbose_name="Изображение",
                               upload_to="posts/",
                               blank=True)
+    updated = models.DateTimeField(auto_now=True,
+                                   verbose_name="Дата изменения")
+    comment_count = models.PositiveIntegerField(
+        default=0, verbose_name="Число комментариев")
+    last_comment_at = models.DateTimeField(
+        null=True, blank=True, verbose_name="Дата последнего комментария")
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = "Post"
         verbose_name_plural = "Posts"
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_idx'),
+            models.Index(fields=['-comment_count', '-id'],
+                         name='post_discussed_idx')]
 
     def __str__(self):
         return self.text[:15]
 
+    def delete(self, *args, **kwargs):
+        with marked_deleting([self.pk]):
+            return super().delete(*args, **kwargs)
+
 
 class Comment(CreateModel):
     post = models.ForeignKey(Post,
@@ -65,6 +115,8 @@ class Comment(CreateModel):
     class Meta:
         verbose_name = "Post comment"
         verbose_name_plural = "Post comments"
+        indexes = [models.Index(fields=['post', 'pub_date', 'id'],
+                                name='comment_post_pub_date_idx')]
 
 
 class Follow(models.Model):
@@ -85,3 +137,64 @@ class Follow(models.Model):
         verbose_name_plural = "Subscribes"
         constraints = [models.UniqueConstraint(fields=['user', 'author'],
                        name='unique_subscribe')]
+
+
+class Timeline(models.Model):
+    """Готовая лента подписок: строка на каждую пару читатель-пост."""
+    user = models.ForeignKey(User,
+                             related_name="timeline",
+                             on_delete=models.CASCADE,
+                             verbose_name="reader")
+    post = models.ForeignKey(Post,
+                             related_name="timeline",
+                             on_delete=models.CASCADE,
+                             verbose_name="post")
+    pub_date = models.DateTimeField(verbose_name="post publication date")
+
+    def __str__(self):
+        return f'{self.post_id} in timeline of {self.user}'
+
+    class Meta:
+        verbose_name = "Timeline entry"
+        verbose_name_plural = "Timeline entries"
+        constraints = [models.UniqueConstraint(fields=['user', 'post'],
+                       name='unique_timeline_post')]
+        indexes = [models.Index(fields=['user', '-pub_date', '-post'],
+                                name='timeline_user_date_idx')]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счетчики автора."""
+    user = models.OneToOneField(User,
+                                primary_key=True,
+                                related_name="stats",
+                                on_delete=models.CASCADE,
+                                verbose_name="author")
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name="posts count")
+
+    def __str__(self):
+        return f'{self.user}: {self.posts_count} posts'
+
+    class Meta:
+        verbose_name = "Author statistics"
+        verbose_name_plural = "Authors statistics"
+
+
+class PostSearch(models.Model):
+    """Строка индекса FTS5 по тексту поста; таблицу ведут триггеры."""
+    post = models.OneToOneField(Post,
+                                primary_key=True,
+                                db_column="rowid",
+                                db_constraint=False,
+                                related_name="search",
+                                on_delete=models.DO_NOTHING,
+                                verbose_name="post")
+    text = SearchField(verbose_name="indexed text")
+    rank = models.FloatField(verbose_name="bm25 rank")
+
+    class Meta:
+        managed = False
+        db_table = "posts_post_fts"
+        verbose_name = "Post search entry"
+        verbose_name_plural = "Post search entries"
@@ -0,0 +1,101 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+from django.db.models import F
+
+from .utils import POSTS_ORDERING
+
+SEARCH_TABLE = 'posts_post_fts'
+SEARCH_ORDERING = ('search_rank', 'id')
+SEARCH_TRIGGERS = (
+    f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert '
+    f'AFTER INSERT ON posts_post BEGIN '
+    f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (new.id, new.text); '
+    f'END',
+    f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete '
+    f'AFTER DELETE ON posts_post BEGIN '
+    f'INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, text) '
+    f"VALUES ('delete', old.id, old.text); "
+    f'END',
+    f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update '
+    f'AFTER UPDATE OF text ON posts_post BEGIN '
+    f'INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, text) '
+    f"VALUES ('delete', old.id, old.text); "
+    f'INSERT INTO {SEARCH_TABLE} (rowid, text) VALUES (new.id, new.text); '
+    f'END',
+)
+
+
+def full_text_available(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Запрос пользователя в выражение FTS5: все слова, по префиксу.
+
+    Каждое слово берется в кавычки, поэтому операторы FTS5 из ввода
+    не интерпретируются и не ломают запрос.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def match_posts(queryset, query):
+    """Посты, подходящие под запрос: через FTS5, без него - через LIKE."""
+    expression = match_expression(query)
+    if not expression:
+        return queryset.none()
+    if not full_text_available():
+        return queryset.filter(text__icontains=query.strip())
+    return queryset.filter(search__text__match=expression)
+
+
+def search_posts(queryset, query):
+    """Найденные посты и порядок выдачи для постраничного вывода.
+
+    С FTS5 посты идут по релевантности bm25 (аннотация search_rank),
+    иначе - по дате, как в лентах.
+    """
+    posts = match_posts(queryset, query)
+    if not full_text_available() or not match_expression(query):
+        return posts, POSTS_ORDERING
+    return posts.annotate(search_rank=F('search__rank')), SEARCH_ORDERING
+
+
+def install_triggers(using=connection):
+    """Восстанавливает триггеры, если миграция пересоздала posts_post."""
+    if (not full_text_available(using)
+            or SEARCH_TABLE not in using.introspection.table_names()):
+        return
+    with using.cursor() as cursor:
+        for statement in SEARCH_TRIGGERS:
+            cursor.execute(statement)
+
+
+def rebuild_index(using=connection):
+    """Перестраивает индекс по текущему содержимому posts_post."""
+    if not full_text_available(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) '
+                       f"VALUES ('rebuild')")
+
+
+@contextmanager
+def deferred_index(using=connection):
+    """Массовая загрузка без триггеров: индекс строится один раз в конце.
+
+    Построчное обновление FTS5 из триггера в несколько раз дороже
+    самой вставки поста. Используется внутри transaction.atomic:
+    при ошибке откат вернет удаленные триггеры.
+    """
+    if (not full_text_available(using)
+            or SEARCH_TABLE not in using.introspection.table_names()):
+        yield
+        return
+    with using.cursor() as cursor:
+        for action in ('insert', 'delete', 'update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{action}')
+    yield
+    install_triggers(using)
+    rebuild_index(using)
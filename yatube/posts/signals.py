@@ -0,0 +1,144 @@
+from core.tasks import enqueue
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import (GROUPS_SCOPE, INDEX_SCOPE, POST_AUTHOR_KEY,
+                    author_card_scope, author_scope, bump, group_scope,
+                    post_scope)
+from .models import Comment, Follow, Group, Post, User, deleting_posts
+from .search import install_triggers
+from .stats import change_posts_count, comment_added, comment_removed
+from .timeline import backfill_timeline, fan_out_post, prune_timeline
+
+
+def invalidate_post(post, group_ids):
+    slugs = (Group.objects.filter(pk__in=group_ids)
+             .values_list('slug', flat=True))
+    bump(INDEX_SCOPE, post_scope(post.pk),
+         author_scope(post.author.username), *map(group_scope, slugs))
+
+
+def invalidate_posts(post_ids):
+    """Посты изменены в обход сигналов, например пересчетом счетчиков."""
+    scopes = {INDEX_SCOPE, GROUPS_SCOPE}
+    for pk, username, slug in (Post.objects.filter(pk__in=post_ids)
+                               .values_list('pk', 'author__username',
+                                            'group__slug')):
+        scopes.update({post_scope(pk), author_scope(username)})
+        if slug:
+            scopes.add(group_scope(slug))
+    bump(*scopes)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    instance._old_group_id = None
+    if instance.pk is not None:
+        instance._old_group_id = (Post.objects.filter(pk=instance.pk)
+                                  .values_list('group_id', flat=True)
+                                  .first())
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    invalidate_post(instance, {instance.group_id,
+                               getattr(instance, '_old_group_id', None)})
+    if created:
+        change_posts_count(instance.author_id, 1)
+        enqueue(fan_out_post, instance.pk, key=f'fan-out:{instance.pk}')
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    invalidate_post(instance, {instance.group_id})
+    change_posts_count(instance.author_id, -1)
+
+
+def invalidate_comment(post_id):
+    """Счетчик комментариев виден в карточке, поэтому меняются и ленты."""
+    post = (Post.objects.filter(pk=post_id)
+            .values('author__username', 'group__slug').first())
+    scopes = [post_scope(post_id)]
+    if post is not None:
+        scopes += [INDEX_SCOPE, author_scope(post['author__username'])]
+        if post['group__slug']:
+            scopes.append(group_scope(post['group__slug']))
+    bump(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        comment_added(instance.post_id, instance.pub_date)
+    invalidate_comment(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    # Каскад при удалении поста: счетчик и страницы уйдут вместе с ним.
+    # Посты помечает Post.delete и QuerySet.delete, см. marked_deleting.
+    if instance.post_id in deleting_posts():
+        return
+    comment_removed(instance.post_id)
+    invalidate_comment(instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    bump(GROUPS_SCOPE)
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, **kwargs):
+    instance._old_username = None
+    if instance.pk is not None:
+        instance._old_username = (User.objects.filter(pk=instance.pk)
+                                  .values_list('username', flat=True)
+                                  .first())
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or update_fields - {'last_login'}:
+        usernames = {instance.username,
+                     getattr(instance, '_old_username', None)} - {None}
+        posts = Post.objects.filter(author=instance)
+        # Карточки с именем автора есть и на страницах групп.
+        slugs = (posts.filter(group__isnull=False)
+                 .values_list('group__slug', flat=True).distinct())
+        bump(INDEX_SCOPE, *map(author_scope, usernames),
+             *map(author_card_scope, usernames), *map(group_scope, slugs))
+        if usernames != {instance.username}:
+            # Страница поста ищется в кэше по имени автора.
+            cache.delete_many([POST_AUTHOR_KEY.format(pk) for pk in
+                               posts.values_list('pk', flat=True)])
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    bump(INDEX_SCOPE, author_scope(instance.username),
+         author_card_scope(instance.username))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        backfill_timeline(instance.user_id, instance.author_id)
+    bump(author_scope(instance.author.username))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    prune_timeline(instance.user_id, instance.author_id)
+    bump(author_scope(instance.author.username))
+
+
+@receiver(post_migrate)
+def search_index_migrated(sender, using, **kwargs):
+    """Пересборка posts_post миграцией сносит триггеры индекса поиска."""
+    if sender.name == 'posts':
+        install_triggers(connections[using])
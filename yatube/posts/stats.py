@@ -0,0 +1,82 @@
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AuthorStats, Comment, Post, User
+
+
+def change_posts_count(author_id, delta):
+    """Атомарно сдвигает счетчик постов автора на delta."""
+    updated = (AuthorStats.objects
+               .filter(user_id=author_id, posts_count__gte=-delta)
+               .update(posts_count=F('posts_count') + delta))
+    if not updated and delta > 0:
+        recount_author(author_id)
+
+
+def recount_author(author_id):
+    """Пересчитывает счетчик одного автора по таблице постов."""
+    AuthorStats.objects.update_or_create(
+        user_id=author_id,
+        defaults={'posts_count':
+                  Post.objects.filter(author=author_id).count()})
+
+
+def recount_all():
+    """Пересчитывает счетчики всех авторов; возвращает число исправлений."""
+    fixed = 0
+    actual = dict(User.objects.annotate(total=Count('posts'))
+                  .values_list('pk', 'total'))
+    stored = dict(AuthorStats.objects.values_list('user_id', 'posts_count'))
+    for author_id, total in actual.items():
+        if stored.get(author_id, 0) != total:
+            AuthorStats.objects.update_or_create(
+                user_id=author_id, defaults={'posts_count': total})
+            fixed += 1
+    return fixed
+
+
+def posts_count(author):
+    """Счетчик постов автора без обращения к таблице постов."""
+    try:
+        return author.stats.posts_count
+    except AuthorStats.DoesNotExist:
+        return 0
+
+
+def post_comments():
+    """Комментарии поста из внешнего запроса, сгруппированные по посту."""
+    return (Comment.objects.filter(post=OuterRef('pk'))
+            .order_by().values('post'))
+
+
+def comment_added(post_id, pub_date):
+    """Учитывает новый комментарий в счетчике и дате активности поста."""
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + 1,
+        last_comment_at=pub_date,
+        updated=timezone.now())
+
+
+def comment_removed(post_id):
+    """Учитывает удаление комментария; дата берется из оставшихся."""
+    Post.objects.filter(pk=post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1,
+        last_comment_at=Subquery(post_comments().annotate(
+            last=Max('pub_date')).values('last')),
+        updated=timezone.now())
+
+
+def recount_comments():
+    """Пересчитывает комментарии всех постов; возвращает id исправленных."""
+    total = Coalesce(Subquery(post_comments().annotate(
+        total=Count('pk')).values('total')), 0)
+    stale = (Post.objects.order_by().annotate(actual=total)
+             .exclude(comment_count=F('actual')).values('pk'))
+    fixed = list(stale.values_list('pk', flat=True))
+    Post.objects.filter(pk__in=stale).update(
+        comment_count=total,
+        last_comment_at=Subquery(post_comments().annotate(
+            last=Max('pub_date')).values('last')),
+        updated=timezone.now())
+    return fixed
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..fragments import marker, render_fragment
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def fragment(context, name, *args):
+    """Часть страницы для текущего пользователя.
+
+    В странице, которая кэшируется общей для всех, вместо фрагмента
+    остается метка: ее заполняет cache_page_versioned при выдаче.
+    """
+    request = context.get('request')
+    if getattr(request, 'defer_fragments', False):
+        return mark_safe(marker(name, *args))
+    return mark_safe(render_fragment(request, name, *args))
@@ -0,0 +1,38 @@
+from core.metrics import count_cache
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..cache import (CARD_CACHE_TIMEOUT, GROUPS_SCOPE, author_card_scope,
+                     get_versions, post_card_key)
+from ..feeds import card_urls
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post.html'
+
+
+@register.simple_tag
+def post_cards(posts, variant='feed'):
+    """HTML карточек ленты: одно чтение кэша, рендер только промахов."""
+    posts = list(posts)
+    authors = sorted({post.author.username for post in posts})
+    groups_version, *author_versions = get_versions(
+        [GROUPS_SCOPE, *map(author_card_scope, authors)])
+    author_versions = dict(zip(authors, author_versions))
+    keys = [post_card_key(post, variant, groups_version,
+                          author_versions[post.author.username])
+            for post in posts]
+    cards = cache.get_many(keys)
+    misses = [(post, key) for post, key in zip(posts, keys)
+              if key not in cards]
+    card_urls([post for post, _ in misses])
+    missing = {key: render_to_string(
+        CARD_TEMPLATE, {'post': post, 'show_group_link': variant != 'group'})
+        for post, key in misses}
+    count_cache(hits=len(cards), misses=len(missing))
+    if missing:
+        cache.set_many(missing, CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
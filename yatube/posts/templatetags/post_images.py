@@ -0,0 +1,15 @@
+from django import template
+
+from ..thumbnails import existing_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_url(image, geometry, **options):
+    """Адрес готовой миниатюры, пока ее нет - адрес оригинала.
+
+    Миниатюры создает задача generate_post_thumbnails, см. schedule_thumbnails.
+    """
+    thumbnail = existing_thumbnail(image.name, geometry, **options)
+    return thumbnail.url if thumbnail is not None else image.url
@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from ..datagen import DataGenerator
+from ..models import AuthorStats, Comment, Follow, Group, Post, Timeline, User
+from ..search import match_posts
+from ..stats import recount_all
+from ..timeline import rebuild_timelines
+
+
+class DataGeneratorTest(TestCase):
+    def generate(self, seed=0):
+        return DataGenerator(seed, batch_size=50).generate(
+            users=20, groups=3, posts=200, comments=300, follows=60)
+
+    def test_counts_and_denormalized_tables(self):
+        """Созданы все строки, счетчики и ленты согласованы."""
+        rows = self.generate()
+
+        self.assertEqual(rows['posts'], Post.objects.count())
+        self.assertEqual(rows['comments'], Comment.objects.count())
+        self.assertEqual(rows['follows'], Follow.objects.count())
+        self.assertEqual(AuthorStats.objects.count(), rows['users'])
+        self.assertEqual(recount_all(), 0, 'Счетчики постов расходятся')
+        timeline = set(Timeline.objects.values_list('user', 'post'))
+        rebuild_timelines()
+        self.assertEqual(timeline,
+                         set(Timeline.objects.values_list('user', 'post')))
+
+    def test_dates_spread(self):
+        """Даты постов разнесены по истории, а не равны моменту вставки."""
+        self.generate()
+
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 100)
+
+    def test_deterministic(self):
+        """Один seed дает одинаковые тексты."""
+        self.generate(seed=7)
+        first = list(Post.objects.order_by('pk')
+                     .values_list('text', flat=True))
+        Post.objects.all().delete()
+
+        self.generate(seed=7)
+
+        self.assertEqual(first, list(Post.objects.order_by('pk')
+                                     .values_list('text', flat=True)))
+
+    def test_power_law_and_search_index(self):
+        """Посты по авторам распределены неравномерно, индекс построен."""
+        call_command('seed', users=50, groups=3, posts=1000, comments=100,
+                     follows=100, posts_alpha=1.5, stdout=StringIO())
+
+        counts = sorted(Post.objects.order_by().values('author')
+                        .annotate(total=Count('pk'))
+                        .values_list('total', flat=True), reverse=True)
+        self.assertGreater(counts[0], 10 * counts[len(counts) // 2],
+                           'Нет тяжелого хвоста у постов на автора')
+        word = Post.objects.first().text.split()[0]
+        self.assertTrue(match_posts(Post.objects.all(), word).exists(),
+                        'Индекс поиска не построен после загрузки')
+
+    def test_seed_independent_of_run_day(self):
+        """Один --seed дает те же даты в любой день запуска."""
+        dates = []
+        for today in (datetime(2026, 3, 1, tzinfo=timezone.utc),
+                      datetime(2026, 9, 1, tzinfo=timezone.utc)):
+            with mock.patch('django.utils.timezone.now', return_value=today):
+                call_command('seed', users=10, groups=2, posts=50,
+                             comments=20, follows=10, stdout=StringIO())
+            dates.append(list(Post.objects.order_by('pk')
+                              .values_list('pub_date', flat=True)))
+            User.objects.all().delete()
+            Group.objects.all().delete()
+
+        self.assertEqual(dates[0], dates[1])
+
+    def test_seed_now_option(self):
+        """--now задает конец истории дат."""
+        call_command('seed', '--now', '2020-06-01', users=10, groups=2,
+                     posts=50, comments=20, follows=10, stdout=StringIO())
+        end = datetime(2020, 6, 1, tzinfo=timezone.utc)
+
+        self.assertLessEqual(Post.objects.latest('pub_date').pub_date, end)
+        self.assertGreater(Post.objects.earliest('pub_date').pub_date,
+                           end - timedelta(days=366))
@@ -3,6 +3,7 @@ import tempfile
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
@@ -118,9 +119,11 @@ class PostFormTest(TestCase):
         self.assertEqual(Comment.objects.count(), comments_counter + 1,
                          'Ошибка создания комментария')
 
+        # Заготовка страницы уже в кэше после редиректа.
+        cache.clear()
         response = self.authorized_client.get(
             reverse('posts:post_detail', kwargs={'post_id': self.post.pk}))
-        comment_obj = response.context['comments'].get()
+        comment_obj = response.context['comments'].object_list[0]
 
         self.assertEqual(comment_obj, self.post.comments.get(),
                          'Ошибка вывода комментария к посту в шаблон')
@@ -0,0 +1,145 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..views import AMOUNT_COMMENTS, AMOUNT_POSTS
+
+User = get_user_model()
+REPORT_ENV = 'QUERY_BUDGET_REPORT'
+# Запросов на холодном кэше для авторизованного читателя, включая
+# чтение сессии и пользователя.
+BUDGETS = {
+    'index': 3,
+    'discussed': 3,
+    'group_list': 4,
+    'profile': 4,
+    'post_detail': 5,
+    'post_comments': 3,
+    'follow_index': 3,
+    'search': 3,
+    'post_create': 3,
+    'post_edit': 5,
+}
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов каждой view не растет с объемом данных.
+
+    Один и тот же набор страниц снимается на малом и на большом
+    наборе данных. При QUERY_BUDGET_REPORT=<файл> SQL всех страниц
+    записывается в отчет.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_slug',
+                                         description='Тестовое описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост с комментариями')
+        cls.report = []
+
+    @classmethod
+    def tearDownClass(cls):
+        path = os.getenv(REPORT_ENV)
+        if path:
+            with open(path, 'w') as report:
+                report.write('\n'.join(cls.report))
+        super().tearDownClass()
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def seed(self, volume, posts, comments):
+        """Посты разных авторов и групп и комментарии разных читателей."""
+        authors = [self.author] + [
+            User.objects.create_user(username=f'{volume}_{number}')
+            for number in range(3)]
+        groups = [self.group, Group.objects.create(
+            title=f'Группа {volume}', slug=f'group_{volume}')]
+        for author in authors[1:]:
+            Follow.objects.create(user=self.reader, author=author)
+        for number in range(posts):
+            Post.objects.create(author=authors[number % len(authors)],
+                                group=groups[number % len(groups)],
+                                text=f'Пост номер {number}')
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=authors[number % len(authors)],
+                    text=f'Комментарий {number}')
+            for number in range(comments))
+
+    def pages(self):
+        comments = self.reader_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        ).context['comments']
+        return {
+            'index': (self.reader_client, reverse('posts:index')),
+            'discussed': (self.reader_client, reverse('posts:discussed')),
+            'group_list': (self.reader_client,
+                           reverse('posts:group_list',
+                                   kwargs={'slug': self.group.slug})),
+            'profile': (self.reader_client,
+                        reverse('posts:profile',
+                                kwargs={'username': 'auth'})),
+            'post_detail': (self.reader_client,
+                            reverse('posts:post_detail',
+                                    kwargs={'post_id': self.post.pk})),
+            'post_comments': (
+                self.reader_client,
+                reverse('posts:post_comments',
+                        kwargs={'post_id': self.post.pk})
+                + f'?cursor={comments.next_cursor or ""}'),
+            'follow_index': (self.reader_client,
+                             reverse('posts:follow_index')),
+            'search': (self.reader_client,
+                       f"{reverse('posts:search')}?q=пост"),
+            'post_create': (self.author_client,
+                            reverse('posts:post_create')),
+            'post_edit': (self.author_client,
+                          reverse('posts:post_edit',
+                                  kwargs={'post_id': self.post.pk})),
+        }
+
+    def measure(self, volume):
+        counts = {}
+        for name, (client, url) in self.pages().items():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url)
+            counts[name] = queries.captured_queries
+            self.report.append(f'-- {name} [{volume}]: '
+                               f'{len(queries)} queries, {url}')
+            self.report.extend(f"{query['sql']};"
+                               for query in queries.captured_queries)
+        return counts
+
+    def test_query_budgets(self):
+        """Бюджет запросов не зависит от размера страницы и комментариев."""
+        self.seed('small', posts=3, comments=3)
+        small = self.measure('small')
+        self.seed('large', posts=AMOUNT_POSTS * 3,
+                  comments=AMOUNT_COMMENTS * 2)
+        large = self.measure('large')
+
+        for name, budget in BUDGETS.items():
+            with self.subTest(view=name):
+                sql = '\n'.join(f"{number}. {query['sql']}" for number, query
+                                in enumerate(large[name], start=1))
+                self.assertEqual(len(large[name]), len(small[name]),
+                                 f'{name}: число запросов растет с '
+                                 f'объемом данных\n{sql}')
+                self.assertLessEqual(len(large[name]), budget,
+                                     f'{name}: бюджет превышен\n{sql}')
@@ -0,0 +1,110 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..views import AMOUNT_POSTS
+
+User = get_user_model()
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\S+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTest(TestCase):
+    """Все запросы views идут по индексам, без полного скана и сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_slug',
+                                         description='Тестовое описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {number}')
+            for number in range(AMOUNT_POSTS * 3))
+        cls.post = Post.objects.create(author=cls.author, group=cls.group,
+                                       text='Пост с комментариями')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.reader, text=f'Коммент {i}')
+            for i in range(60))
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def assert_plans(self, name, send_request):
+        with CaptureQueriesContext(connection) as queries:
+            send_request()
+        selects = [query['sql'] for query in queries.captured_queries
+                   if query['sql'].startswith('SELECT')]
+        self.assertTrue(selects, f'{name}: не выполнено ни одного SELECT')
+        for sql in selects:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = [row[-1] for row in cursor.fetchall()]
+            for step in plan:
+                with self.subTest(view=name, step=step):
+                    self.assertFalse(
+                        FULL_SCAN.match(step) or TEMP_SORT in step,
+                        f'{name}: {step}\n{sql}')
+
+    def test_read_views(self):
+        """Страницы чтения, включая глубокие страницы по курсору."""
+        first_page = self.reader_client.get(reverse('posts:index'))
+        cursor = first_page.context['page_obj'].next_cursor
+        discussed = reverse('posts:discussed')
+        discussed_cursor = self.reader_client.get(
+            discussed).context['page_obj'].next_cursor
+        detail = reverse('posts:post_detail',
+                         kwargs={'post_id': self.post.pk})
+        comments = self.reader_client.get(detail).context['comments']
+        urls = {
+            'index': reverse('posts:index'),
+            'index cursor': f"{reverse('posts:index')}?cursor={cursor}",
+            'discussed': discussed,
+            'discussed cursor': f'{discussed}?cursor={discussed_cursor}',
+            'group_posts': reverse('posts:group_list',
+                                   kwargs={'slug': 'test_slug'}),
+            'profile': reverse('posts:profile', kwargs={'username': 'auth'}),
+            'post_detail': detail,
+            'post_comments': (
+                reverse('posts:post_comments',
+                        kwargs={'post_id': self.post.pk})
+                + f'?cursor={comments.next_cursor}'),
+            'follow_index': reverse('posts:follow_index'),
+        }
+
+        for name, url in urls.items():
+            cache.clear()
+            self.assert_plans(name, lambda: self.reader_client.get(url))
+
+    def test_write_views(self):
+        """Запись поста, комментария и подписки с сигналами."""
+        posts = {
+            'post_create': (reverse('posts:post_create'),
+                            {'text': 'Новый пост', 'group': self.group.pk}),
+            'add_comment': (reverse('posts:add_comment',
+                                    kwargs={'post_id': self.post.pk}),
+                            {'text': 'Новый комментарий'}),
+        }
+        gets = {
+            'profile_unfollow': reverse('posts:profile_unfollow',
+                                        kwargs={'username': 'auth'}),
+            'profile_follow': reverse('posts:profile_follow',
+                                      kwargs={'username': 'auth'}),
+        }
+
+        for name, (url, data) in posts.items():
+            self.assert_plans(
+                name, lambda: self.reader_client.post(url, data))
+        for name, url in gets.items():
+            self.assert_plans(name, lambda: self.reader_client.get(url))
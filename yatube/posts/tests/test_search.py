@@ -0,0 +1,98 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SEARCH_TABLE
+
+User = get_user_model()
+AMOUNT_POSTS = 10
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.rare = Post.objects.create(author=cls.author,
+                                       text='Котики спят на диване')
+        cls.frequent = Post.objects.create(
+            author=cls.author, text='Котики, котики и еще раз котики')
+        cls.other = Post.objects.create(author=cls.author,
+                                        text='Собаки гуляют во дворе')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(reverse('posts:search'),
+                                   {'q': query, **params})
+        return response.context['page_obj']
+
+    def test_ranked_prefix_search(self):
+        """Поиск по началу слова, релевантные посты выше."""
+        page = self.search('КОТ')
+
+        self.assertEqual(page.object_list, [self.frequent, self.rare],
+                         'Ошибка ранжирования результатов поиска')
+
+    def test_index_follows_posts(self):
+        """Индекс обновляется при изменении и удалении постов."""
+        Post.objects.filter(pk=self.other.pk).update(text='Котики гуляют')
+        self.assertIn(self.other, self.search('котики').object_list)
+        self.assertEqual(self.search('собаки').object_list, [])
+
+        Post.objects.get(pk=self.other.pk).delete()
+        self.assertNotIn(self.other, self.search('котики').object_list)
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        for query in ('"котики', 'котики OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('posts:search'),
+                                           {'q': query})
+
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_pagination(self):
+        """Следующая страница поиска открывается по курсору."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Котики номер {number}')
+            for number in range(AMOUNT_POSTS))
+        first = self.search('котики')
+
+        second = self.search('котики', cursor=first.next_cursor)
+
+        self.assertEqual(len(first) + len(second), AMOUNT_POSTS + 2)
+        self.assertFalse(set(first.object_list) & set(second.object_list))
+        self.assertIsNone(second.next_cursor)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идет через MATCH, а не LIKE."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.force_login(admin)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:posts_post_changelist'),
+                                       {'q': 'собаки'})
+
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.other])
+        self.assertFalse([query for query in queries.captured_queries
+                          if 'LIKE' in query['sql']])
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает потерянный индекс."""
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) "
+                           f"VALUES ('delete-all')")
+        self.assertEqual(self.search('собаки').object_list, [])
+
+        call_command('rebuild_search_index', stdout=StringIO())
+
+        self.assertEqual(self.search('собаки').object_list, [self.other])
@@ -0,0 +1,174 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import AuthorStats, Comment, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='auth')
+        self.client = Client()
+
+    def posts_count(self):
+        return AuthorStats.objects.get(user=self.author).posts_count
+
+    def test_counter_follows_create_and_delete(self):
+        """Счетчик меняется при создании и удалении постов."""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(3)]
+        self.assertEqual(self.posts_count(), 3)
+
+        posts[0].delete()
+        self.assertEqual(self.posts_count(), 2)
+
+        Post.objects.filter(author=self.author).delete()
+        self.assertEqual(self.posts_count(), 0,
+                         'Массовое удаление не учтено в счетчике')
+
+    def test_author_cascade_delete(self):
+        """Удаление автора каскадно удаляет посты и счетчик."""
+        Post.objects.create(author=self.author, text='Пост')
+
+        self.author.delete()
+
+        self.assertFalse(AuthorStats.objects.exists())
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет расхождение счетчика."""
+        Post.objects.create(author=self.author, text='Пост')
+        AuthorStats.objects.filter(user=self.author).update(posts_count=7)
+
+        call_command('recount', stdout=StringIO())
+
+        self.assertEqual(self.posts_count(), 1)
+
+    def test_views_read_counter(self):
+        """profile и post_detail не считают посты автора запросом."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        urls = (reverse('posts:profile', kwargs={'username': 'auth'}),
+                reverse('posts:post_detail', kwargs={'post_id': post.pk}))
+
+        for url in urls:
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(url)
+
+                self.assertEqual(response.context['counter'], 1)
+                self.assertFalse(
+                    [query for query in queries.captured_queries
+                     if 'COUNT(' in query['sql']],
+                    f'{url} считает посты запросом COUNT')
+
+
+class CommentStatsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def comment(self, post=None):
+        return Comment.objects.create(post=post or self.post,
+                                      author=self.author, text='Коммент')
+
+    def test_counter_follows_comments(self):
+        """Счетчик и дата активности меняются вместе с комментариями."""
+        first = self.comment()
+        last = self.comment()
+        post = Post.objects.get(pk=self.post.pk)
+
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(post.last_comment_at, last.pub_date)
+
+        last.delete()
+        post = Post.objects.get(pk=self.post.pk)
+
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.last_comment_at, first.pub_date)
+
+        first.delete()
+        post = Post.objects.get(pk=self.post.pk)
+
+        self.assertEqual(post.comment_count, 0)
+        self.assertIsNone(post.last_comment_at)
+
+    def test_post_delete_skips_comment_counters(self):
+        """Удаление поста не пересчитывает счетчик на каждый комментарий."""
+        def delete_queries(comments):
+            post = Post.objects.create(author=self.author, text='Удаляемый')
+            for _ in range(comments):
+                self.comment(post)
+            with CaptureQueriesContext(connection) as queries:
+                post.delete()
+            return len(queries)
+
+        self.assertEqual(delete_queries(20), delete_queries(1))
+
+        last = self.comment()
+        last.delete()
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 0,
+                         'Отдельное удаление комментария не учтено')
+
+    def test_failed_delete_keeps_comment_counters(self):
+        """Пост, который не удалось удалить, снова считает комментарии."""
+        first = self.comment()
+        self.comment()
+
+        with mock.patch('django.db.models.sql.DeleteQuery.delete_batch',
+                        side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Post.objects.get(pk=self.post.pk).delete()
+        first.delete()
+
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 1,
+                         'Пометка удаления осталась после ошибки')
+
+    def test_recount_refreshes_pages(self):
+        """Исправленный счетчик виден в закэшированных лентах."""
+        self.comment()
+        Post.objects.update(comment_count=5)
+        url = reverse('posts:index')
+        self.assertContains(self.client.get(url), 'Комментариев: 5')
+
+        call_command('recount', stdout=StringIO())
+
+        self.assertContains(self.client.get(url), 'Комментариев: 1')
+
+    def test_recount_repairs_comments(self):
+        """Команда recount исправляет счетчик комментариев."""
+        self.comment()
+        Post.objects.update(comment_count=5, last_comment_at=None)
+
+        call_command('recount', stdout=StringIO())
+        post = Post.objects.get(pk=self.post.pk)
+
+        self.assertEqual(post.comment_count, 1)
+        self.assertIsNotNone(post.last_comment_at)
+
+    def test_discussed_feed(self):
+        """Лента обсуждаемых упорядочена по числу комментариев."""
+        quiet = Post.objects.create(author=self.author, text='Тихий пост')
+        url = reverse('posts:discussed')
+        self.client.get(url)
+        self.client.post(reverse('posts:add_comment',
+                                 kwargs={'post_id': self.post.pk}),
+                         {'text': 'Коммент'})
+
+        response = self.client.get(url)
+
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.post, quiet])
+        self.assertContains(response, 'Комментариев: 1')
+        self.assertContains(self.client.get(reverse('posts:index')),
+                            'Комментариев: 1')
@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from core.tasks import run_pending
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..thumbnails import generate_thumbnails
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CREATE_THUMBNAIL = ('sorl.thumbnail.base.ThumbnailBackend.'
+                    '_create_thumbnail')
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_THUMBNAIL_WORKERS=0)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name='small.gif',
+                                     content=SMALL_GIF,
+                                     content_type='image/gif'))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_render_does_not_resize(self):
+        urls = (reverse('posts:index'),
+                reverse('posts:post_detail',
+                        kwargs={'post_id': self.post.pk}))
+
+        with mock.patch(CREATE_THUMBNAIL) as create_thumbnail:
+            for url in urls:
+                with self.subTest(url=url):
+                    response = Client().get(url)
+
+                    self.assertContains(response, '<img')
+            create_thumbnail.assert_not_called()
+
+    def test_render_does_not_resize(self):
+        """После генерации страницы не сжимают изображения."""
+        generate_thumbnails(self.post.image.name)
+
+        self.assert_render_does_not_resize()
+
+    def test_warm_thumbnails(self):
+        """Команда warm_thumbnails создает миниатюры всех постов."""
+        out = StringIO()
+
+        call_command('warm_thumbnails', stdout=out)
+
+        self.assertIn('Обработано изображений: 1', out.getvalue())
+        self.assert_render_does_not_resize()
+
+    @override_settings(TASKS_EAGER=False)
+    def test_render_before_task(self):
+        """До задачи страницы отдают оригинал, а не сжимают его сами."""
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:post_create'), {
+            'text': 'Пост до миниатюры',
+            'image': SimpleUploadedFile(name='fresh.gif', content=SMALL_GIF,
+                                        content_type='image/gif')})
+        post = Post.objects.get(text='Пост до миниатюры')
+        url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
+
+        with mock.patch(CREATE_THUMBNAIL) as create_thumbnail:
+            response = Client().get(url)
+        create_thumbnail.assert_not_called()
+        self.assertContains(response, f'src="{post.image.url}"')
+
+        run_pending()
+
+        self.assertNotContains(Client().get(url), f'src="{post.image.url}"',
+                               msg_prefix='Готовая миниатюра не видна')
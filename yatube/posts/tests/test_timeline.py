@@ -0,0 +1,64 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, Timeline
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old_post = Post.objects.create(author=cls.author,
+                                           text='Пост до подписки')
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def timeline(self):
+        return list(Timeline.objects.filter(user=self.reader)
+                    .values_list('post_id', flat=True)
+                    .order_by('-pub_date', '-post'))
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        """Подписка наполняет ленту, отписка очищает."""
+        self.reader_client.get(reverse('posts:profile_follow',
+                                       kwargs={'username': 'auth'}))
+
+        self.assertEqual(self.timeline(), [self.old_post.pk],
+                         'Старые посты автора не попали в ленту')
+
+        self.reader_client.get(reverse('posts:profile_unfollow',
+                                       kwargs={'username': 'auth'}))
+
+        self.assertEqual(self.timeline(), [],
+                         'Посты автора остались в ленте после отписки')
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+
+        self.assertEqual(self.timeline(), [new_post.pk, self.old_post.pk])
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'].object_list,
+                         [new_post, self.old_post],
+                         'Ошибка вывода ленты подписок')
+
+    def test_rebuild_timelines(self):
+        """Команда rebuild_timelines восстанавливает ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Timeline.objects.all().delete()
+
+        call_command('rebuild_timelines', stdout=StringIO())
+
+        self.assertEqual(self.timeline(), [self.old_post.pk],
+                         'Ленты не восстановлены командой')
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.paginator import EmptyPage
+from django.test import RequestFactory, TestCase
+
+from ..models import Post
+from ..utils import CursorPaginator, encode_cursor, paginate_posts
+
+User = get_user_model()
+AMOUNT_POSTS = 10
+AMOUNT_TEST_POSTS = 25
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Тестовый пост {number}')
+            for number in range(AMOUNT_TEST_POSTS))
+        cls.factory = RequestFactory()
+
+    def get_page(self, **params):
+        request = self.factory.get('/', params)
+        return paginate_posts(request, Post.objects.all(), AMOUNT_POSTS)
+
+    def test_walk_forward_and_back(self):
+        """Курсоры обходят всю ленту без пропусков и повторов."""
+        expected = list(Post.objects.order_by('-pub_date', '-id'))
+        seen = []
+        page = self.get_page()
+        pages = [page]
+        while page.next_cursor:
+            page = self.get_page(cursor=page.next_cursor)
+            pages.append(page)
+        for page in pages:
+            seen.extend(page.object_list)
+
+        self.assertEqual(seen, expected, 'Ошибка обхода ленты по курсору')
+        self.assertEqual(len(pages[-1]), AMOUNT_TEST_POSTS % AMOUNT_POSTS)
+
+        back = self.get_page(cursor=pages[-1].previous_cursor)
+        self.assertEqual(back.object_list, pages[-2].object_list,
+                         'Ошибка перехода на предыдущую страницу')
+
+    def test_cursor_page_without_count(self):
+        """Страница по курсору - один запрос без COUNT и OFFSET."""
+        first = self.get_page()
+        request = self.factory.get('/', {'cursor': first.next_cursor})
+        paginator = CursorPaginator(Post.objects.all(), AMOUNT_POSTS)
+
+        with self.assertNumQueries(1):
+            page = paginator.get_cursor_page(request.GET['cursor'])
+            self.assertEqual(len(page), AMOUNT_POSTS)
+
+    def test_legacy_page_number(self):
+        """Старые ссылки ?page= продолжают работать."""
+        page = self.get_page(page=3)
+
+        self.assertEqual(len(page), AMOUNT_TEST_POSTS % AMOUNT_POSTS)
+        self.assertIsNotNone(page.previous_cursor)
+        self.assertIsNone(page.next_cursor)
+
+    def test_page_api_without_count(self):
+        """has_next и соседние номера отвечают без запросов к базе."""
+        first = self.get_page()
+        cursor_page = self.get_page(cursor=first.next_cursor)
+        last = self.get_page(page=3)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(first.has_next())
+            self.assertFalse(first.has_previous())
+            self.assertEqual(first.next_page_number(), 2)
+            self.assertEqual((first.start_index(), first.end_index()),
+                             (1, AMOUNT_POSTS))
+            self.assertTrue(cursor_page.has_next())
+            self.assertTrue(cursor_page.has_previous())
+            self.assertTrue(cursor_page.has_other_pages())
+            self.assertFalse(last.has_next())
+            self.assertEqual(last.previous_page_number(), 2)
+            self.assertEqual(last.end_index(), AMOUNT_TEST_POSTS)
+        with self.assertRaises(EmptyPage):
+            last.next_page_number()
+        with self.assertRaises(EmptyPage):
+            cursor_page.next_page_number()
+
+    def test_invalid_cursor(self):
+        """Некорректный курсор отдает первую страницу."""
+        first = self.get_page()
+        cursors = ('garbage', encode_cursor('next', ['not a date', 1]),
+                   encode_cursor('sideways', [1, 1]))
+
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                page = self.get_page(cursor=cursor)
+
+                self.assertEqual(page.object_list, first.object_list)
@@ -1,6 +1,10 @@
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
+from unittest import mock, skipIf
 
+from core.middleware import PIN_COOKIE
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -9,8 +13,10 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
-from ..views import AMOUNT_POSTS
+from ..cache import LOCAL_CACHE_TIMEOUT, SHARED_CACHE
+from ..feeds import card_urls, feed_posts
+from ..models import Comment, Follow, Group, Post
+from ..views import AMOUNT_COMMENTS, AMOUNT_POSTS
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -239,34 +245,326 @@ class PostPagesTests(TestCase):
                                  4,
                                  'Ошибка вывода кол-во постов на странице')
 
+    def test_comments_chunks(self):
+        """Комментарии выводятся порциями, остальные - фрагментами."""
+        amount_test_comments = AMOUNT_COMMENTS + 5
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.user, text=f'Коммент {i}')
+            for i in range(amount_test_comments))
+
+        response = self.guest_client.get(
+            reverse(self.post_id, kwargs={'post_id': self.post.pk}))
+        comments = response.context['comments']
+
+        self.assertEqual(len(comments), AMOUNT_COMMENTS,
+                         'Ошибка вывода первой порции комментариев')
+        self.assertContains(response, 'Показать еще комментарии')
+
+        response = self.guest_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.pk}),
+            {'cursor': comments.next_cursor})
+
+        self.assertTemplateUsed(response, 'includes/comments.html')
+        self.assertEqual(len(response.context['comments']),
+                         amount_test_comments - AMOUNT_COMMENTS,
+                         'Ошибка вывода следующей порции комментариев')
+        self.assertContains(response, f'Коммент {amount_test_comments - 1}')
+        self.assertNotContains(response, 'Показать еще комментарии')
+
     def test_cache(self):
-        """Проверка кэширования"""
-        cache.clear()
+        """Страница берется из кэша, пока не изменились ее данные."""
         cache_post = Post.objects.create(
             author=PostPagesTests.author,
             text='Пост для тестирования кэша',
             group=PostPagesTests.group)
-
-        response_before_del_post = self.guest_client.get(reverse(self.index))
-        content = response_before_del_post.content
-
-        self.assertIn(cache_post.text.encode(), content,
+        urls = (reverse(self.index),
+                reverse(self.group_post, kwargs={'slug': 'test_slug'}),
+                reverse(self.profile, kwargs={'username': 'auth'}),
+                reverse(self.post_id, kwargs={'post_id': self.post.pk}))
+
+        for url in urls:
+            with self.subTest(url=url):
+                first_response = self.guest_client.get(url)
+                cached_response = self.guest_client.get(url)
+
+                self.assertEqual(first_response.content,
+                                 cached_response.content,
+                                 'Ошибка кэширования страницы')
+                self.assertEqual(cached_response.templates, [],
+                                 'Страница не взята из кэша')
+
+        self.assertIn(cache_post.text.encode(),
+                      self.guest_client.get(reverse(self.index)).content,
                       'Пост не выводится при запросе')
 
         cache_post.delete()
         response_after_del_post = self.guest_client.get(reverse(self.index))
 
-        self.assertEqual(content, response_after_del_post.content,
-                         'Ошибка кэширования постов')
+        self.assertNotIn(cache_post.text.encode(),
+                         response_after_del_post.content,
+                         'Удаленный пост остался в кэше страницы')
+
+    def test_cache_invalidation_by_comment(self):
+        """Новый комментарий сбрасывает кэш страницы поста."""
+        url = reverse(self.post_id, kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий для сброса кэша'})
+
+        self.assertIn('Комментарий для сброса кэша'.encode(),
+                      self.guest_client.get(url).content,
+                      'Комментарий не виден из-за кэша')
+
+    def test_conditional_get(self):
+        """Неизменная страница отдается ответом 304 без рендера."""
+        url = reverse(self.post_id, kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        etag = response['ETag']
+
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(response.templates, [])
 
-        cache.clear()
-        response_after_cache_clear = self.guest_client.get(reverse(self.index))
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+        self.assertNotEqual(
+            self.authorized_client.get(url)['ETag'], etag,
+            'Страница вошедшего пользователя с тем же ETag, что у гостя')
+
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'Комментарий для смены ETag'})
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_replica_page_after_change(self):
+        """Страница с реплики сразу после изменения без валидаторов."""
+        url = reverse(self.post_id, kwargs={'post_id': self.post.pk})
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Комментарий, которого нет на реплике')
+
+        with mock.patch('posts.cache.reading_from_replica',
+                        return_value=True):
+            response = self.guest_client.get(url)
+            self.assertFalse(response.has_header('ETag'),
+                             'ETag новой версии у страницы с реплики')
+            self.assertFalse(response.has_header('Last-Modified'))
+            self.assertNotEqual(self.guest_client.get(url).templates, [],
+                                'Страница с реплики сохранена в кэш')
+
+        self.assertTrue(self.guest_client.get(url).has_header('ETag'))
+
+    def test_conditional_get_after_login(self):
+        """Страница гостя не подтверждается 304 после входа."""
+        url = reverse(self.index)
+        response = self.guest_client.get(url)
+        last_modified = response['Last-Modified']
+
+        not_modified = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(not_modified.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertIn('Cookie', not_modified['Vary'])
+
+        response = self.authorized_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn('Last-Modified', response)
+        self.assertContains(response, 'Выйти')
+
+    def test_conditional_get_after_delete(self):
+        """Удаление поста меняет ETag ленты."""
+        post = Post.objects.create(author=PostPagesTests.author,
+                                   text='Пост для удаления')
+        url = reverse(self.index)
+        etag = self.guest_client.get(url)['ETag']
+
+        post.delete()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotContains(response, 'Пост для удаления')
+
+    @skipIf(SHARED_CACHE, 'версии в общем кэше видны всем процессам')
+    def test_local_cache_versions_expire(self):
+        """Версии в кэше процесса живут недолго: их не видят другие воркеры."""
+        url = reverse(self.index)
+        etag = self.guest_client.get(url)['ETag']
+        later = time.time() + LOCAL_CACHE_TIMEOUT + 1
+
+        with mock.patch('time.time', return_value=later):
+            response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('posts/index.html',
+                      [template.name for template in response.templates])
+
+    def test_stale_while_revalidate(self):
+        """Пока страницу пересчитывает другой запрос, отдается прошлая."""
+        url = reverse(self.index)
+        self.guest_client.get(url)
+        Post.objects.create(author=self.author, text='Пост после кэша')
+
+        with mock.patch.object(cache, 'add', return_value=False):
+            stale = self.guest_client.get(url)
+            with mock.patch('posts.cache.LOCK_WAIT', 0.1):
+                pinned = Client()
+                pinned.cookies[PIN_COOKIE] = '1'
+                fresh_for_writer = pinned.get(url)
+
+        self.assertEqual(stale.templates, [])
+        self.assertNotContains(stale, 'Пост после кэша')
+        self.assertFalse(stale.has_header('ETag'),
+                         'Прошлая страница с ETag текущей версии')
+        self.assertFalse(stale.has_header('Last-Modified'))
+        self.assertContains(fresh_for_writer, 'Пост после кэша',
+                            msg_prefix='Автору отдана устаревшая страница')
+        self.assertContains(self.guest_client.get(url), 'Пост после кэша')
+
+    def test_early_refresh(self):
+        """Страница изредка пересчитывается до истечения срока."""
+        url = reverse(self.index)
+        self.guest_client.get(url)
+
+        with mock.patch('posts.cache.EARLY_REFRESH_BETA', 10 ** 9):
+            with mock.patch('posts.cache.random.random', return_value=0.5):
+                response = self.guest_client.get(url)
+            self.assertNotEqual(response.templates, [],
+                                'Нет раннего пересчета')
+
+            with mock.patch('posts.cache.random.random', return_value=0):
+                response = self.guest_client.get(url)
+            self.assertEqual(response.templates, [])
+
+    def test_shared_page_shell(self):
+        """Вошедшие пользователи делят заготовку, фрагменты у каждого свои."""
+        url = reverse(self.profile, kwargs={'username': 'auth'})
+        follower = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=self.author)
+        follower_client = Client()
+        follower_client.force_login(follower)
+
+        first = self.authorized_client.get(url)
+        shared = follower_client.get(url)
+        own = self.author_client.get(url)
+
+        self.assertIn('posts/profile.html',
+                      [template.name for template in first.templates])
+        for response in (shared, own):
+            names = [template.name for template in response.templates]
+            self.assertNotIn('posts/profile.html', names,
+                             'Заготовка страницы не взята из кэша')
+            self.assertNotContains(response, '<!--fragment')
+        self.assertContains(first, 'Пользователь: test_user')
+        self.assertContains(first, 'Подписаться')
+        self.assertContains(shared, 'Пользователь: follower')
+        self.assertContains(shared, 'Отписаться')
+        self.assertContains(own, 'Пользователь: auth')
+        self.assertNotContains(own, 'Подписаться')
+
+    def test_shell_comment_form(self):
+        """Форма комментария с CSRF в странице поста из кэша."""
+        url = reverse(self.post_id, kwargs={'post_id': self.post.pk})
+        self.authorized_client.get(url)
+
+        response = self.authorized_client.get(url)
+
+        self.assertNotIn('posts/post_detail.html',
+                         [template.name for template in response.templates])
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertContains(response, reverse(
+            'posts:add_comment', kwargs={'post_id': self.post.pk}))
+        self.assertNotContains(self.guest_client.get(url),
+                               'csrfmiddlewaretoken')
+
+    def test_card_urls(self):
+        """Ссылки карточки совпадают с reverse и не требуют запросов."""
+        author = User.objects.create_user(username='user+name@mail.ru')
+        Post.objects.create(author=author, text='Пост', group=self.group)
+        posts = list(feed_posts().filter(author=author))
+
+        with self.assertNumQueries(0):
+            card_urls(posts)
+            post = posts[0]
+            self.assertEqual(post.profile_url, reverse(
+                self.profile, kwargs={'username': author.username}))
+            self.assertEqual(post.detail_url, reverse(
+                self.post_id, kwargs={'post_id': post.pk}))
+            self.assertEqual(post.group_url, reverse(
+                self.group_post, kwargs={'slug': self.group.slug}))
+            self.assertEqual(post.author.get_full_name(), '')
+
+    def test_post_cards_cache(self):
+        """Карточка поста рендерится один раз для всех лент."""
+        card = 'includes/post.html'
+        response = self.guest_client.get(reverse(self.index))
 
-        self.assertNotEqual(content, response_after_cache_clear.content,
-                            'Ошибка очистки кэша')
-        self.assertNotIn(cache_post.text.encode(),
-                         response_after_cache_clear.content,
-                         'Пост выводится при запросе посли очистки кэша')
+        self.assertIn(card, [t.name for t in response.templates])
+
+        response = self.guest_client.get(reverse(
+            self.profile, kwargs={'username': 'auth'}))
+
+        self.assertNotIn(card, [t.name for t in response.templates],
+                         'Карточка поста не взята из кэша')
+
+        response = self.guest_client.get(reverse(
+            self.group_post, kwargs={'slug': 'test_slug'}))
+
+        self.assertIn(card, [t.name for t in response.templates],
+                      'Лента группы использует карточку общей ленты')
+        self.assertNotContains(response, 'все записи группы')
+
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Измененный текст поста'
+        post.save()
+        response = self.guest_client.get(reverse(self.index))
+
+        self.assertContains(response, 'Измененный текст поста')
+
+    def test_post_cards_author_renamed(self):
+        """Смена имени автора обновляет его карточки во всех лентах."""
+        urls = (reverse(self.index),
+                reverse(self.group_post, kwargs={'slug': 'test_slug'}),
+                reverse(self.profile, kwargs={'username': 'auth'}))
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name, author.last_name = 'Alice', 'A'
+        author.save()
+        for url in urls:
+            self.guest_client.get(url)
+
+        author.first_name = 'Bob'
+        author.save()
+
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertContains(response, 'Bob A')
+                self.assertNotContains(response, 'Alice A')
+
+    def test_author_renamed(self):
+        """После смены имени старый профиль не отдается из кэша."""
+        old_profile = reverse(self.profile, kwargs={'username': 'auth'})
+        detail = reverse(self.post_id, kwargs={'post_id': self.post.pk})
+        self.guest_client.get(old_profile)
+        self.guest_client.get(detail)
+
+        author = User.objects.get(pk=self.author.pk)
+        author.username = 'renamed'
+        author.save()
+
+        self.assertEqual(self.guest_client.get(old_profile).status_code,
+                         HTTPStatus.NOT_FOUND)
+        response = self.guest_client.get(detail)
+        self.assertContains(response, reverse(
+            self.profile, kwargs={'username': 'renamed'}))
+        self.assertNotContains(response, f'href="{old_profile}"')
 
     def test_subscribe(self):
         """авторизованный пользователь может подписываться на пользователей."""
@@ -0,0 +1,85 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from core.tasks import enqueue, task
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as thumbnail_defaults
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+_executor = None
+
+
+def _init_worker():
+    if not apps.ready:
+        django.setup()
+    # Соединения родителя не закрываем: воркер откроет свои.
+    for connection in connections.all():
+        connection.connection = None
+
+
+def generate_thumbnails(image_name):
+    """Создает миниатюры всех настроенных размеров для изображения."""
+    for geometry, options in settings.POST_THUMBNAILS:
+        get_thumbnail(image_name, geometry, **options)
+    return image_name
+
+
+def thumbnail_file(image_name, geometry, **options):
+    """Файл миниатюры под тем именем, которое даст ей get_thumbnail."""
+    backend = default.backend
+    source = ImageFile(image_name)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(thumbnail_defaults, attr):
+            options.setdefault(key, value)
+    return ImageFile(
+        backend._get_thumbnail_filename(source, geometry, options),
+        default.storage)
+
+
+def existing_thumbnail(image_name, geometry, **options):
+    """Готовая миниатюра или None: в запросе миниатюры не создаются."""
+    return default.kvstore.get(thumbnail_file(image_name, geometry,
+                                              **options))
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.POST_THUMBNAIL_WORKERS,
+            initializer=_init_worker)
+    return _executor
+
+
+@task()
+def generate_post_thumbnails(image_name):
+    """Задача очереди: миниатюры нового изображения поста.
+
+    В воркере очереди ресайз идет в пуле процессов, как у warm_thumbnails;
+    ошибка пула возвращается в воркер и приводит к повтору задачи.
+    """
+    if settings.TASKS_EAGER or not settings.POST_THUMBNAIL_WORKERS:
+        generate_thumbnails(image_name)
+    else:
+        get_executor().submit(generate_thumbnails, image_name).result()
+    # Карточки и страницы до этого ссылались на оригинал.
+    for post in Post.objects.filter(image=image_name):
+        post.save(update_fields=['updated'])
+
+
+def schedule_thumbnails(post):
+    """Ставит генерацию миниатюр в очередь фоновых задач."""
+    if post.image:
+        enqueue(generate_post_thumbnails, post.image.name,
+                key=f'thumbnails:{post.image.name}')
@@ -0,0 +1,70 @@
+from core.tasks import task
+from django.db import connection
+from django.db.models import F
+
+from .models import Follow, Post, Timeline
+
+BATCH_SIZE = 1000
+TIMELINE_ORDERING = ('-feed_date', '-feed_post')
+
+
+def timeline_posts(user):
+    """Посты ленты подписок: диапазон индекса timeline по читателю."""
+    return (Post.objects.filter(timeline__user=user)
+            .annotate(feed_date=F('timeline__pub_date'),
+                      feed_post=F('timeline__post')))
+
+
+@task()
+def fan_out_post(post_id):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).only('author', 'pub_date').first()
+    if post is None:
+        return
+    followers = (Follow.objects.filter(author=post.author_id)
+                 .values_list('user_id', flat=True))
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+         for user_id in followers.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту читателя все посты нового автора."""
+    posts = (Post.objects.filter(author=author_id)
+             .values_list('pk', 'pub_date'))
+    Timeline.objects.bulk_create(
+        (Timeline(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True)
+
+
+def backfill_follows(after_id=0):
+    """Наполняет ленты по подпискам с id больше after_id одним запросом.
+
+    Для массовой загрузки: подписки, созданные bulk_create, минуют
+    сигналы и backfill_timeline.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {Timeline._meta.db_table} (user_id, post_id, '
+            f'pub_date) SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'INNER JOIN {Post._meta.db_table} post '
+            f'ON post.author_id = follow.author_id '
+            f'WHERE follow.id > %s', [after_id])
+        return cursor.rowcount
+
+
+def prune_timeline(user_id, author_id):
+    """Убирает из ленты читателя посты автора после отписки."""
+    Timeline.objects.filter(user=user_id, post__author=author_id).delete()
+
+
+def rebuild_timelines():
+    """Пересобирает все ленты по текущим подпискам."""
+    Timeline.objects.all().delete()
+    for user_id, author_id in Follow.objects.values_list('user', 'author'):
+        backfill_timeline(user_id, author_id)
@@ -1,7 +1,175 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+from types import MethodType
 
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db.models import Q
 
-def paginate_posts(request, post_list, amount_posts):
-    paginator = Paginator(post_list, amount_posts)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+POSTS_ORDERING = ('-pub_date', '-id')
+DISCUSSED_ORDERING = ('-comment_count', '-id')
+COMMENTS_ORDERING = ('pub_date', 'id')
+CURSOR_NEXT = 'next'
+CURSOR_PREVIOUS = 'prev'
+
+
+def encode_cursor(direction, values):
+    """Упаковывает направление и ключ сортировки в непрозрачный токен."""
+    data = json.dumps(
+        [direction, *values],
+        default=lambda value: value.isoformat(),
+        separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Распаковывает токен; при любой ошибке бросает ValueError."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeError, json.JSONDecodeError):
+        raise ValueError('Некорректный курсор')
+    if (not isinstance(data, list) or len(data) != size + 1
+            or data[0] not in (CURSOR_NEXT, CURSOR_PREVIOUS)):
+        raise ValueError('Некорректный курсор')
+    return data[0], data[1:]
+
+
+class CursorPageMethods:
+    """Методы Page, которые знают соседей без COUNT всей выборки.
+
+    Привязываются к экземпляру Page: тип страницы остается Page.
+    У страницы по курсору нет номера, поэтому номера соседей и позиции
+    записей известны только у страниц, открытых по ?page=.
+    """
+    names = ('has_next', 'has_previous', 'next_page_number',
+             'previous_page_number', 'start_index', 'end_index')
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        if not self._has_next or self.number is None:
+            raise EmptyPage('Следующей страницы нет')
+        return self.number + 1
+
+    def previous_page_number(self):
+        if not self._has_previous or self.number is None:
+            raise EmptyPage('Предыдущей страницы нет')
+        return self.number - 1
+
+    def start_index(self):
+        if self.number is None:
+            return None
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        if self.number is None:
+            return None
+        return max(self.start_index() + len(self.object_list) - 1, 0)
+
+    @classmethod
+    def bind(cls, page, has_previous, has_next):
+        page._has_previous = has_previous
+        page._has_next = has_next
+        for name in cls.names:
+            setattr(page, name, MethodType(getattr(cls, name), page))
+        return page
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки без OFFSET и COUNT.
+
+    Страница ищется условием по ключу последней показанной записи,
+    поэтому время ответа не зависит от глубины страницы.
+    """
+
+    def __init__(self, object_list, per_page, ordering=POSTS_ORDERING):
+        super().__init__(object_list.order_by(*ordering), per_page)
+        self.ordering = ordering
+        self.keys = [field.lstrip('-') for field in ordering]
+
+    def get_cursor_page(self, cursor=None, number=None):
+        """Страница по курсору, а без него - по номеру (старые ссылки)."""
+        if cursor:
+            try:
+                direction, values = decode_cursor(cursor, len(self.keys))
+                return self._seek_page(direction, values)
+            except (ValueError, TypeError, ValidationError):
+                pass
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            return self.get_cursor_page()
+        return self._build_page(items[:self.per_page], number,
+                                has_previous=number > 1,
+                                has_next=len(items) > self.per_page)
+
+    def _seek_page(self, direction, values):
+        backwards = direction == CURSOR_PREVIOUS
+        queryset = self.object_list.filter(self._seek(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+            return self._build_page(items, None,
+                                    has_previous=has_more, has_next=True)
+        return self._build_page(items, None,
+                                has_previous=True, has_next=has_more)
+
+    def _seek(self, values, backwards):
+        """Условие «строго после ключа» в порядке сортировки."""
+        lookups = []
+        for field in self.ordering:
+            descending = field.startswith('-') != backwards
+            lookups.append('lt' if descending else 'gt')
+        condition = Q()
+        for index, key in enumerate(self.keys):
+            step = Q(**{f'{key}__{lookups[index]}': values[index]})
+            for prefix_key, prefix_value in zip(self.keys[:index], values):
+                step &= Q(**{prefix_key: prefix_value})
+            condition |= step
+        bound = Q(**{f'{self.keys[0]}__{lookups[0]}e': values[0]})
+        return bound & condition
+
+    def _key(self, obj):
+        return [getattr(obj, key) for key in self.keys]
+
+    def _build_page(self, items, number, has_previous, has_next):
+        page = CursorPageMethods.bind(self._get_page(items, number, self),
+                                      has_previous, has_next)
+        page.previous_cursor = None
+        page.next_cursor = None
+        if items and has_previous:
+            page.previous_cursor = encode_cursor(CURSOR_PREVIOUS,
+                                                 self._key(items[0]))
+        if items and has_next:
+            page.next_cursor = encode_cursor(CURSOR_NEXT,
+                                             self._key(items[-1]))
+        return page
+
+
+def paginate_posts(request, post_list, amount_posts,
+                   ordering=POSTS_ORDERING):
+    paginator = CursorPaginator(post_list, amount_posts, ordering)
+    return paginator.get_cursor_page(request.GET.get('cursor'),
+                                     request.GET.get('page'))
+
+
+def paginate_comments(request, comment_list, amount_comments):
+    paginator = CursorPaginator(comment_list, amount_comments,
+                                COMMENTS_ORDERING)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
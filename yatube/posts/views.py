@@ -1,39 +1,70 @@
+from core.routers import read_from_replica
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from .cache import (cache_page_versioned, conditional_page, group_scopes,
+                    index_scopes, post_detail_scopes, profile_scopes)
+from .feeds import feed_posts
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
-from .utils import paginate_posts
+from .search import search_posts
+from .stats import posts_count
+from .thumbnails import schedule_thumbnails
+from .timeline import TIMELINE_ORDERING, timeline_posts
+from .utils import DISCUSSED_ORDERING, paginate_comments, paginate_posts
 
 AMOUNT_POSTS = 10
+AMOUNT_COMMENTS = 50
 
 User = get_user_model()
 
 
-@cache_page(20, key_prefix='index_page')
+@read_from_replica
+@conditional_page(index_scopes)
+@cache_page_versioned(index_scopes)
 def index(request):
-    post_list = Post.objects.select_related('group', 'author')
+    post_list = feed_posts()
     context = {'page_obj': paginate_posts(request, post_list, AMOUNT_POSTS)}
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@conditional_page(index_scopes)
+@cache_page_versioned(index_scopes)
+def discussed(request):
+    context = {'page_obj': paginate_posts(request, feed_posts(), AMOUNT_POSTS,
+                                          DISCUSSED_ORDERING)}
+    return render(request, 'posts/discussed.html', context)
+
+
+@read_from_replica
+@conditional_page(group_scopes)
+@cache_page_versioned(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    post_list = feed_posts(group.posts.all())
     context = {'group': group,
                'page_obj': paginate_posts(request, post_list, AMOUNT_POSTS)}
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@conditional_page(profile_scopes)
+@cache_page_versioned(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    counter = post_list.count()
-    following = False
+    authors = User.objects.select_related('stats')
     if request.user.is_authenticated:
-        following = request.user.follower.filter(author=author.id).exists()
+        # Подписка читается в том же запросе, что и автор.
+        authors = authors.annotate(is_followed=Exists(Follow.objects.filter(
+            user=request.user.id, author=OuterRef('pk'))))
+    author = get_object_or_404(authors, username=username)
+    post_list = feed_posts(author.posts.all())
+    counter = posts_count(author)
+    following = getattr(author, 'is_followed', False)
+    # Кнопке подписки не нужен повторный запрос.
+    request.follow_state = {author.username: following}
     context = {'author': author,
                'page_obj': paginate_posts(request, post_list, AMOUNT_POSTS),
                'counter': counter,
@@ -41,12 +72,17 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@read_from_replica
+@conditional_page(post_detail_scopes)
+@cache_page_versioned(post_detail_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id)
     author = post.author
-    counter = author.posts.count()
+    counter = posts_count(author)
     form = CommentForm()
-    comments = post.comments
+    comments = paginate_comments(
+        request, post.comments.select_related('author'), AMOUNT_COMMENTS)
     context = {'author': author,
                'post': post,
                'counter': counter,
@@ -55,6 +91,26 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@read_from_replica
+@cache_page_versioned(post_detail_scopes)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = paginate_comments(
+        request, post.comments.select_related('author'), AMOUNT_COMMENTS)
+    context = {'post': post, 'comments': comments}
+    return render(request, 'includes/comments.html', context)
+
+
+@read_from_replica
+def search(request):
+    query = request.GET.get('q', '').strip()
+    post_list, ordering = search_posts(feed_posts(), query)
+    context = {'query': query,
+               'page_obj': paginate_posts(request, post_list, AMOUNT_POSTS,
+                                          ordering)}
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -62,6 +118,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        schedule_thumbnails(post)
         return redirect('posts:profile', username=post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -76,6 +133,8 @@ def post_edit(request, post_id):
                     instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            schedule_thumbnails(post)
         return redirect('posts:post_detail', post_id)
     context = {'form': form, 'is_edit': True}
     return render(request, 'posts/create_post.html', context)
@@ -93,10 +152,12 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_from_replica
 @login_required
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user.id)
-    context = {'page_obj': paginate_posts(request, post_list, AMOUNT_POSTS)}
+    post_list = feed_posts(timeline_posts(request.user))
+    context = {'page_obj': paginate_posts(request, post_list, AMOUNT_POSTS,
+                                          TIMELINE_ORDERING)}
     return render(request, 'posts/follow.html', context)
 
 
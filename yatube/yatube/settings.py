@@ -1,4 +1,5 @@
 import os
+import sys
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -30,24 +31,35 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # Шаблон компилируется один раз на процесс, см. TEMPLATE_WARMUP;
+    # с DEBUG правки шаблонов видны без перезапуска.
+    TEMPLATE_LOADERS = [('django.template.loaders.cached.Loader',
+                         TEMPLATE_LOADERS)]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -59,15 +71,50 @@ TEMPLATES = [
     },
 ]
 
+# debug_toolbar ищет APP_DIRS=True, но app_directories.Loader уже есть
+# в TEMPLATE_LOADERS: шаблоны приложений находятся так же.
+SILENCED_SYSTEM_CHECKS = ['debug_toolbar.W006']
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {'timeout': 5},
     }
 }
 
+DATABASE_REPLICAS = []
+
+for number, path in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {**DATABASES['default'],
+                                     'NAME': path,
+                                     'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = 5
+
+REPLICA_PAGE_CACHE_TIMEOUT = 60
+
+SQLITE_PROFILES = {
+    'default': {},
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+SQLITE_PRAGMAS = SQLITE_PROFILES[os.getenv('SQLITE_PROFILE', 'production')]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,6 +144,17 @@ STATIC_URL = '/static/'
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
+STATIC_ROOT = os.getenv('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStorage'
+
+# Компилировать все шаблоны при старте WSGI-приложения.
+TEMPLATE_WARMUP = os.getenv(
+    'TEMPLATE_WARMUP', str(not DEBUG)).lower() == 'true'
+
+# Отдавать STATIC_ROOT из WSGI-приложения, без прокси.
+STATIC_SERVE = os.getenv('STATIC_SERVE', 'false').lower() == 'true'
+
 LOGIN_URL = 'users:login'
 
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -111,8 +169,77 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+POST_THUMBNAILS = (('960x339', {'upscale': True}),)
+
+POST_THUMBNAIL_WORKERS = int(
+    os.getenv('POST_THUMBNAIL_WORKERS', os.cpu_count() or 1))
+
+# manage.py test и pytest.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+
+# Задачи выполняются в запросе только в тестах; иначе - воркер run_tasks.
+TASKS_EAGER = os.getenv('TASKS_EAGER', str(TESTING)).lower() == 'true'
+
+TASK_MAX_ATTEMPTS = 5
+
+TASK_BACKOFF_SECONDS = 10
+
+TASK_BACKOFF_MAX_SECONDS = 60 * 60
+
+TASK_LEASE_SECONDS = 5 * 60
+
+TASK_RETENTION_DAYS = 7
+
+# Общий для процессов кэш по умолчанию: версии страниц, поднятые одним
+# воркером, видят все. locmem - для одного процесса и для тестов.
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem' if TESTING else 'sqlite')
+
+SHARED_CACHES = {
+    'sqlite': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.getenv('CACHE_LOCATION',
+                              os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': 100000}},
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyLibMCCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '127.0.0.1:11211')},
+    # Требует пакета django-redis.
+    'redis': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', 'redis://127.0.0.1:6379/0')},
+}
+
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+else:
+    CACHES = {
+        'shared': SHARED_CACHES[CACHE_BACKEND],
+        'default': {
+            'BACKEND': 'core.cache_backends.TieredCache',
+            'LOCATION': 'shared',
+            'OPTIONS': {
+                'LOCAL_TIMEOUT': int(os.getenv('CACHE_LOCAL_TIMEOUT', 5)),
+                'LOCAL_EXCLUDE': ['version:'],
+                'COALESCE': os.getenv(
+                    'CACHE_COALESCE', 'true').lower() == 'true'}}}
 
 INTERNAL_IPS = ['127.0.0.1']
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'metrics': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.metrics': {
+            'handlers': ['metrics'],
+            'level': os.getenv('METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
@@ -1,3 +1,4 @@
+from core.views import metrics
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
@@ -11,6 +12,7 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('', include('posts.urls', namespace='posts')),
+    path('admin/metrics/', metrics, name='metrics'),
     path('admin/', admin.site.urls),
     path('about/', include('about.urls', namespace='about')),
 ]